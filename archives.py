@@ -0,0 +1,199 @@
+"""Lecture des chapitres archivés (CBZ/ZIP, CBR/RAR) sans extraction.
+
+Une page d'archive est désignée par un chemin virtuel
+"<archive><ARCHIVE_SEPARATOR><membre>". Les membres sont lus par accès
+direct grâce au répertoire central de l'archive et passés au décodeur en
+mémoire, sans fichier temporaire. Chaque thread ouvre sa propre instance
+de l'archive, ce qui permet à plusieurs workers de décoder des pages de la
+même archive en parallèle.
+
+Le format ZIP est géré par la bibliothèque standard ; d'autres formats
+peuvent être ajoutés avec register_backend() (RAR est activé si le paquet
+optionnel rarfile est installé).
+"""
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import resources
+
+ARCHIVE_SEPARATOR = '::'
+MAX_OPEN_ARCHIVES = 8  # Archives gardées ouvertes par thread
+
+_backends = {}  # extension -> classe d'archive
+
+
+def register_backend(extensions, backend):
+    """Associe des extensions à une classe d'archive.
+
+    La classe est construite avec le chemin de l'archive et doit fournir
+    names(), info(membre) -> (taille, crc), open(membre), read(membre) et close().
+    """
+    for ext in extensions:
+        _backends[ext.lower()] = backend
+
+
+class ZipArchive:
+    """Archive ZIP/CBZ, lue avec zipfile"""
+    def __init__(self, path):
+        import zipfile
+        self._zip = zipfile.ZipFile(path)
+
+    def names(self):
+        return [info.filename for info in self._zip.infolist() if not info.is_dir()]
+
+    def info(self, member):
+        info = self._zip.getinfo(member)
+        return info.file_size, info.CRC
+
+    def open(self, member):
+        return self._zip.open(member)
+
+    def read(self, member):
+        return self._zip.read(member)
+
+    def close(self):
+        self._zip.close()
+
+
+register_backend(('.cbz', '.zip'), ZipArchive)
+
+try:
+    import rarfile
+except ImportError:
+    rarfile = None
+
+if rarfile is not None:
+    class RarArchive(ZipArchive):
+        """Archive RAR/CBR, lue avec le paquet optionnel rarfile (même interface que zipfile)"""
+        def __init__(self, path):
+            self._zip = rarfile.RarFile(path)
+
+    register_backend(('.cbr', '.rar'), RarArchive)
+
+
+def archive_extensions():
+    """Extensions des archives lisibles avec les backends disponibles"""
+    return tuple(_backends)
+
+
+def is_archive(path):
+    return path.lower().endswith(archive_extensions())
+
+
+def make_page_path(archive_path, member):
+    return f"{archive_path}{ARCHIVE_SEPARATOR}{member}"
+
+
+def split_page_path(path):
+    """Retourne (archive, membre) pour une page d'archive, (None, path) sinon"""
+    index = path.find(ARCHIVE_SEPARATOR)
+    while index != -1:
+        if is_archive(path[:index]):
+            return path[:index], path[index + len(ARCHIVE_SEPARATOR):]
+        index = path.find(ARCHIVE_SEPARATOR, index + 1)
+    return None, path
+
+
+def page_container(path):
+    """Archive ou dossier qui contient une page"""
+    archive_path, _ = split_page_path(path)
+    return archive_path if archive_path is not None else os.path.dirname(path)
+
+
+_local = threading.local()
+
+
+def _reset_after_fork():
+    # Un processus créé par fork hérite des archives ouvertes du thread parent, dont il
+    # partagerait la position de lecture : il rouvre les siennes
+    global _local
+    _local = threading.local()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _get_archive(path):
+    """Instance de l'archive propre au thread courant, rouverte si le fichier a changé"""
+    archives = getattr(_local, 'archives', None)
+    if archives is None:
+        archives = _local.archives = OrderedDict()
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = archives.get(path)
+    if cached is not None and cached[0] == signature:
+        archives.move_to_end(path)
+        return cached[1]
+    if cached is not None:
+        del archives[path]
+        _close_archive(cached[1])
+    backend = _backends[os.path.splitext(path)[1].lower()]
+    archive = backend(path)
+    resources.acquire('archive')
+    archives[path] = (signature, archive)
+    while len(archives) > MAX_OPEN_ARCHIVES:
+        _close_archive(archives.popitem(last=False)[1][1])
+    return archive
+
+
+def _close_archive(archive):
+    archive.close()
+    resources.release('archive')
+
+
+def close_thread_archives():
+    """Ferme les archives ouvertes par le thread courant ; à appeler avant la fin d'un thread de courte durée"""
+    archives = getattr(_local, 'archives', None)
+    while archives:
+        _close_archive(archives.popitem()[1][1])
+
+
+def open_page(path, header_only=False):
+    """Source à passer à Image.open : le chemin d'un fichier ou le contenu d'un membre.
+
+    Avec header_only, le membre est ouvert en flux pour ne lire que l'en-tête ;
+    sinon il est lu entièrement en mémoire pour un décodage sans retour arrière.
+    """
+    archive_path, member = split_page_path(path)
+    if archive_path is None:
+        return path
+    archive = _get_archive(archive_path)
+    if header_only:
+        return archive.open(member)
+    return io.BytesIO(archive.read(member))
+
+
+class PageStat:
+    """Signature d'une page d'archive, compatible avec le résultat de os.stat"""
+    __slots__ = ('st_mtime_ns', 'st_size')
+
+    def __init__(self, st_mtime_ns, st_size):
+        self.st_mtime_ns = st_mtime_ns
+        self.st_size = st_size
+
+
+def page_stat(path):
+    """os.stat d'une page, ou date de l'archive et taille du membre pour une page d'archive"""
+    archive_path, member = split_page_path(path)
+    if archive_path is None:
+        return os.stat(path)
+    size, crc = _get_archive(archive_path).info(member)
+    # Le CRC du membre distingue deux versions de même taille
+    return PageStat(os.stat(archive_path).st_mtime_ns ^ crc, size)
+
+
+def list_archive_members(archive_path, extensions):
+    """Membres d'une archive ayant une des extensions données, dans l'ordre de l'archive"""
+    extensions = tuple(ext.lower() for ext in extensions)
+    names = []
+    for name in _get_archive(archive_path).names():
+        base = name.rsplit('/', 1)[-1]
+        # Métadonnées ajoutées par macOS
+        if name.startswith('__MACOSX/') or base.startswith('._'):
+            continue
+        if base.lower().endswith(extensions):
+            names.append(name)
+    return names
@@ -0,0 +1,99 @@
+"""Compare le redimensionnement 'exact' et 'fast' du moteur de décodage.
+
+Pour chaque page, mesure le temps CPU des deux modes, la taille du plus
+gros tampon décodé (pixels de l'image avant le rééchantillonnage final) et
+l'écart de qualité du mode rapide par rapport au rendu exact (PSNR et
+différence maximale par canal).
+
+Utilisation :
+    python benchmarks/decode_quality.py                    # pages synthétiques
+    python benchmarks/decode_quality.py page1.jpg page2.png --width 1000
+"""
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+
+from PIL import Image, ImageChops, ImageDraw, ImageStat
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from reader_engine import decode_and_resize  # noqa: E402
+
+
+def make_synthetic_page(path, size, fmt):
+    """Génère une page de scan factice avec du texte, des traits et des dégradés"""
+    width, height = size
+    img = Image.linear_gradient('L').resize(size).convert('RGB')
+    draw = ImageDraw.Draw(img)
+    for y in range(0, height, 97):
+        draw.line((0, y, width, y + 40), fill=(20, 20, 20), width=3)
+    for x in range(0, width, 53):
+        draw.ellipse((x, x % height, x + 40, x % height + 40), outline=(230, 60, 60), width=2)
+    for y in range(40, height, 160):
+        draw.text((60, y), "The quick brown fox jumps over the lazy dog 0123456789", fill=(0, 0, 0))
+    if fmt in ('JPEG', 'WEBP'):
+        img.save(path, fmt, quality=90)
+    else:
+        img.save(path, fmt)
+
+
+def decoded_pixels(path, width, quality):
+    """Nombre de pixels réellement décodés avant le rééchantillonnage final"""
+    with Image.open(path) as img:
+        if quality == 'fast' and img.format == 'JPEG':
+            height = max(1, int(img.height * width / img.width))
+            img.draft('RGB', (width, height))
+        return img.size[0] * img.size[1]
+
+
+def timed(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.process_time()
+        result = func()
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def psnr(reference, candidate):
+    diff = ImageChops.difference(reference.convert('RGB'), candidate.convert('RGB'))
+    mse = sum(value ** 2 for value in ImageStat.Stat(diff).rms) / 3
+    max_delta = max(high for _, high in diff.getextrema())
+    return (math.inf if mse == 0 else 10 * math.log10(255 ** 2 / mse)), max_delta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='*', help="Pages to benchmark (synthetic pages if omitted)")
+    parser.add_argument('--width', type=int, default=900, help="Target display width")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement (best is kept)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = args.paths
+        if not paths:
+            paths = []
+            for fmt, ext in (('JPEG', 'jpg'), ('PNG', 'png'), ('WEBP', 'webp')):
+                for size in ((2400, 3400), (4000, 5600)):
+                    path = os.path.join(tmp, f"page_{size[0]}x{size[1]}.{ext}")
+                    make_synthetic_page(path, size, fmt)
+                    paths.append(path)
+
+        print(f"{'page':<28} {'exact ms':>9} {'fast ms':>8} {'speedup':>8} "
+              f"{'exact MP':>9} {'fast MP':>8} {'PSNR dB':>8} {'max diff':>9}")
+        for path in paths:
+            exact_time, exact_img = timed(lambda: decode_and_resize(path, args.width, 'exact'), args.repeat)
+            fast_time, fast_img = timed(lambda: decode_and_resize(path, args.width, 'fast'), args.repeat)
+            quality_db, max_delta = psnr(exact_img, fast_img)
+            exact_mp = decoded_pixels(path, args.width, 'exact') / 1e6
+            fast_mp = decoded_pixels(path, args.width, 'fast') / 1e6
+            print(f"{os.path.basename(path)[:28]:<28} {exact_time * 1000:>9.1f} {fast_time * 1000:>8.1f} "
+                  f"{exact_time / max(fast_time, 1e-9):>7.1f}x {exact_mp:>9.2f} {fast_mp:>8.2f} "
+                  f"{quality_db:>8.1f} {max_delta:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,382 @@
+"""Banc d'essai du moteur de lecture, sans interface graphique.
+
+Génère des chapitres synthétiques (JPEG, PNG, WEBP, avec des bandes très
+hautes de webtoon) et les lit avec reader_engine.ReaderEngine et une vue
+minimale, comme le ferait la fenêtre Tk. Chaque format est mesuré dans un
+processus séparé pour que le pic de mémoire lui soit propre :
+
+- ttfp_ms : ouverture du chapitre jusqu'à la première page affichée, aperçu compris ;
+- visible_ms : ouverture jusqu'à ce que tout le premier écran soit net ;
+- full_load_ms : défilement écran par écran jusqu'à la fin du chapitre ;
+- zoom_ms : latence médiane d'un pas de zoom (aperçu puis rendu net) ;
+- warm_ttfp_ms : réouverture avec le cache disque déjà rempli ;
+- cache_hit_rate : taux de réussite du cache d'images en remontant le chapitre ;
+- fling_ms : après un lancer rapide vers le dernier tiers du chapitre (sans
+  cache disque), temps jusqu'à ce que l'écran d'arrivée soit net ;
+- visible_wait_ms : attente moyenne en file des décodages des pages visibles
+  pendant ce lancer (voir DecodePool.stats) ;
+- peak_rss_mb : pic de mémoire résidente du processus.
+
+Le scénario 'startup' mesure l'import de main.py (médiane de plusieurs
+processus neufs), c'est-à-dire le travail fait avant la création de la fenêtre.
+
+Les résultats sont écrits en JSON avec le commit courant ; --compare les
+confronte à un fichier précédent et retourne un code d'erreur si une
+mesure se dégrade au-delà du seuil. --trace enregistre en plus le détail
+des étapes de chaque page (voir instrumentation.py) au format Chrome trace.
+
+Utilisation :
+    python benchmarks/run_benchmarks.py --output before.json
+    python benchmarks/run_benchmarks.py --output after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import PIL
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import instrumentation  # noqa: E402
+from decode_quality import make_synthetic_page  # noqa: E402
+from reader_engine import PIXEL_KINDS, DecodePool, ImageCache, ReaderEngine  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+FORMATS = {'jpeg': ('JPEG', 'jpg'), 'png': ('PNG', 'png'), 'webp': ('WEBP', 'webp')}
+
+# Mesures pour lesquelles une valeur plus grande est meilleure
+HIGHER_IS_BETTER = {'cache_hit_rate'}
+
+TIMEOUT = 120  # s, pour un seul écran
+
+FLING_STEPS = 20  # Positions du viewport pendant un lancer
+FLING_INTERVAL = 0.016  # s entre deux positions, une trame à 60 Hz
+
+
+class HeadlessView:
+    """Vue minimale du moteur : garde les images PIL et note l'heure du premier affichage"""
+    def __init__(self):
+        self.first_shown = None
+        self.shown = 0
+        self.failed = 0
+
+    def create_page_image(self, image):
+        return image
+
+    def page_image_pixels(self, image):
+        return image
+
+    def show_tile(self, tile):
+        if self.first_shown is None:
+            self.first_shown = time.perf_counter()
+        self.shown += 1
+
+    def hide_tile(self, tile):
+        pass
+
+    def page_failed(self, slot):
+        self.failed += 1
+
+    def schedule_tick(self, delay):
+        # Les chapitres synthétiques ne contiennent pas d'animation
+        pass
+
+
+def make_chapter(directory, fmt, pages, size, tall_strips):
+    """Écrit un chapitre synthétique et retourne les chemins de ses pages dans l'ordre"""
+    pil_format, ext = FORMATS[fmt]
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index in range(pages):
+        path = os.path.join(directory, f"{index + 1:03d}.{ext}")
+        # Quelques bandes très hautes, découpées en tuiles par le moteur (WEBP est limité à 16383 px)
+        if index < tall_strips:
+            page_size = (size[0], min(size[1] * 5, 16000))
+        else:
+            page_size = size
+        if not os.path.exists(path):
+            make_synthetic_page(path, page_size, pil_format)
+        paths.append(path)
+    return paths
+
+
+def wait_visible(engine, view_top, view_height):
+    """Pompe les résultats du pool jusqu'à ce que toutes les tuiles visibles soient nettes"""
+    deadline = time.perf_counter() + TIMEOUT
+    while True:
+        engine.poll()
+        tiles = engine.visible_tiles(view_top, view_height)
+        if all(tile.sharp for tile in tiles if tile.slot.kind in PIXEL_KINDS):
+            return
+        if time.perf_counter() > deadline:
+            raise TimeoutError(f"Pages not rendered after {TIMEOUT}s at y={view_top}")
+        time.sleep(0.001)
+
+
+def wait_first_page(engine, view):
+    deadline = time.perf_counter() + TIMEOUT
+    while view.first_shown is None and not view.failed:
+        engine.poll()
+        if time.perf_counter() > deadline:
+            raise TimeoutError(f"No page rendered after {TIMEOUT}s")
+        time.sleep(0.001)
+    return view.first_shown
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilo-octets sous Linux, octets sous macOS
+    return peak / (1048576 if sys.platform == 'darwin' else 1024)
+
+
+def open_timed(engine, view, paths, width, view_height):
+    """Ouvre un chapitre ; retourne (ms jusqu'à la première page, ms jusqu'au premier écran net)"""
+    start = time.perf_counter()
+    engine.open_chapter(paths, width)
+    engine.update_viewport(0, view_height)
+    first = wait_first_page(engine, view)
+    wait_visible(engine, 0, view_height)
+    return (first - start) * 1000, (time.perf_counter() - start) * 1000
+
+
+def run_scenario(paths, args, cache_path):
+    """Mesure un chapitre dans le processus courant"""
+    width, view_height = args.width, args.viewport
+    pool = DecodePool(workers=args.workers, mode='thread', max_pending=args.queue_depth)
+    try:
+        # Ouverture à froid
+        view = HeadlessView()
+        engine = ReaderEngine(view, pool, ImageCache(args.image_cache_mb * 1048576), cache_path, args.quality)
+        ttfp, visible = open_timed(engine, view, paths, width, view_height)
+
+        # Défilement jusqu'à la fin, écran par écran
+        start = time.perf_counter()
+        view_top = 0
+        while view_top < engine.total_height:
+            engine.update_viewport(view_top, view_height)
+            wait_visible(engine, view_top, view_height)
+            view_top += view_height
+        full_load = (time.perf_counter() - start) * 1000
+
+        # Remontée : les pages proches viennent du cache d'images
+        engine.image_cache.hits = engine.image_cache.misses = 0
+        while view_top > 0:
+            view_top = max(0, view_top - view_height)
+            engine.update_viewport(view_top, view_height)
+            wait_visible(engine, view_top, view_height)
+        hit_rate = engine.image_cache.stats()['hit_rate']
+
+        # Pas de zoom au milieu du chapitre : aperçu immédiat puis rendu net
+        view_top = engine.total_height // 2
+        engine.update_viewport(view_top, view_height)
+        wait_visible(engine, view_top, view_height)
+        zoom_steps = []
+        for factor in (1.1, 1.21, 1.1, 1.0, 0.9):
+            start = time.perf_counter()
+            engine.settling = True
+            view_top = engine.relayout(max(1, int(width * factor)), view_top, view_height)
+            engine.settling = False
+            engine.update_viewport(view_top, view_height)
+            wait_visible(engine, view_top, view_height)
+            zoom_steps.append((time.perf_counter() - start) * 1000)
+        engine.close_chapter()
+
+        # Lancer rapide : le viewport traverse le chapitre sans attendre les pages, seul l'écran d'arrivée compte
+        view = HeadlessView()
+        engine = ReaderEngine(view, pool, ImageCache(args.image_cache_mb * 1048576), None, args.quality)
+        open_timed(engine, view, paths, width, view_height)
+        pool.reset_stats()
+        target = engine.total_height * 2 // 3
+        for step in range(1, FLING_STEPS + 1):
+            engine.update_viewport(target * step // FLING_STEPS, view_height)
+            engine.poll()
+            time.sleep(FLING_INTERVAL)
+        start = time.perf_counter()
+        wait_visible(engine, target, view_height)
+        fling = (time.perf_counter() - start) * 1000
+        queue = engine.queue_metrics()
+        engine.close_chapter()
+
+        # Réouverture à chaud : cache d'images vide, cache disque rempli
+        view = HeadlessView()
+        engine = ReaderEngine(view, pool, ImageCache(args.image_cache_mb * 1048576), cache_path, args.quality)
+        warm_ttfp, warm_visible = open_timed(engine, view, paths, width, view_height)
+        engine.close_chapter()
+    finally:
+        pool.shutdown()
+
+    return {
+        'pages': len(paths),
+        'ttfp_ms': round(ttfp, 2),
+        'visible_ms': round(visible, 2),
+        'full_load_ms': round(full_load, 2),
+        'zoom_ms': round(statistics.median(zoom_steps), 2),
+        'warm_ttfp_ms': round(warm_ttfp, 2),
+        'warm_visible_ms': round(warm_visible, 2),
+        'cache_hit_rate': round(hit_rate, 4),
+        'fling_ms': round(fling, 2),
+        'visible_wait_ms': round(queue['urgent_wait_ms'], 2),
+        'peak_rss_mb': None if resource is None else round(peak_rss_mb(), 1),
+    }
+
+
+def measure_startup(repeat=5):
+    """Temps d'import de main.py dans des processus neufs, sans ouvrir de fenêtre"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = ("import time; start = time.perf_counter(); import main; "
+            "print((time.perf_counter() - start) * 1000)")
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True)
+        if output.returncode != 0:
+            sys.stderr.write(output.stderr)
+            return None
+        samples.append(float(output.stdout.strip().splitlines()[-1]))
+    return {'import_ms': round(statistics.median(samples), 2)}
+
+
+def git_commit():
+    try:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Affiche l'écart avec un fichier de référence ; retourne la liste des régressions"""
+    regressions = []
+    print(f"\nCompared with {baseline['meta'].get('label') or baseline['meta'].get('commit')} "
+          f"(threshold {threshold:.0%})")
+    print(f"{'scenario':<8} {'metric':<16} {'before':>10} {'after':>10} {'change':>8}")
+    for name, metrics in results['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if before is None:
+            continue
+        for metric, value in metrics.items():
+            old = before.get(metric)
+            if metric == 'pages' or value is None or not old:
+                continue
+            change = (value - old) / old
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = ''
+            if worse > threshold:
+                flag = '  REGRESSION'
+                regressions.append((name, metric))
+            print(f"{name:<8} {metric:<16} {old:>10} {value:>10} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--formats', default='jpeg,png,webp', help="Comma-separated page formats")
+    parser.add_argument('--no-startup', action='store_true', help="Skip the startup import measurement")
+    parser.add_argument('--pages', type=int, default=40, help="Pages per chapter")
+    parser.add_argument('--size', default='1600x2400', help="Page size, WIDTHxHEIGHT")
+    parser.add_argument('--tall-strips', type=int, default=3, help="Pages five times taller than --size")
+    parser.add_argument('--width', type=int, default=900, help="Reading width")
+    parser.add_argument('--viewport', type=int, default=1000, help="Viewport height")
+    parser.add_argument('--workers', type=int, default=None, help="Decode workers")
+    parser.add_argument('--queue-depth', type=int, default=8, help="Jobs handed to the pool at once")
+    parser.add_argument('--image-cache-mb', type=int, default=256, help="In-memory image cache budget")
+    parser.add_argument('--quality', choices=('fast', 'exact'), default='fast', help="Resampling mode")
+    parser.add_argument('--data-dir', help="Keep the synthetic chapters here between runs")
+    parser.add_argument('--label', help="Name of this run in comparisons (default: current commit)")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--compare', help="Previous results to compare with")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Relative change counted as a regression")
+    parser.add_argument('--trace', help="Write per-page timings and Chrome traces to this directory "
+                                        "(adds instrumentation overhead)")
+    parser.add_argument('--scenario', help=argparse.SUPPRESS)  # Exécution d'un format dans un sous-processus
+    parser.add_argument('--cache-path', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    size = tuple(int(value) for value in args.size.lower().split('x'))
+
+    if args.scenario:
+        paths = make_chapter(os.path.join(args.data_dir, args.scenario), args.scenario, args.pages, size,
+                             args.tall_strips)
+        recorder = None
+        if args.trace:
+            recorder = instrumentation.Recorder()
+            instrumentation.add_hook(recorder)
+        metrics = run_scenario(paths, args, args.cache_path)
+        if recorder is not None:
+            os.makedirs(args.trace, exist_ok=True)
+            recorder.save_chrome_trace(os.path.join(args.trace, f"{args.scenario}.trace.json"))
+            recorder.save_json(os.path.join(args.trace, f"{args.scenario}.timings.json"))
+        json.dump(metrics, sys.stdout)
+        return
+
+    formats = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+    for fmt in formats:
+        if fmt not in FORMATS:
+            parser.error(f"unknown format: {fmt}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or os.path.join(tmp, 'chapters')
+        results = {
+            'meta': {
+                'label': args.label,
+                'commit': git_commit(),
+                'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'pillow': PIL.__version__,
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'config': {key: value for key, value in vars(args).items()
+                           if key not in ('output', 'compare', 'scenario', 'cache_path', 'label', 'trace')},
+            },
+            'scenarios': {},
+        }
+        if not args.no_startup:
+            startup = measure_startup()
+            if startup is not None:
+                results['scenarios']['startup'] = startup
+                print(f"Startup: main.py imported in {startup['import_ms']:.1f} ms\n")
+        print(f"{'scenario':<8} {'pages':>5} {'TTFP ms':>8} {'visible':>8} {'full ms':>9} {'zoom ms':>8} "
+              f"{'warm ms':>8} {'hit rate':>8} {'fling ms':>8} {'RSS MB':>7}")
+        for fmt in formats:
+            # Les pages sont générées dans le sous-processus, qui mesure ensuite un cache disque neuf
+            command = [sys.executable, os.path.abspath(__file__), '--scenario', fmt, '--data-dir', data_dir,
+                       '--cache-path', os.path.join(tmp, f"{fmt}.sqlite3")]
+            for option in ('pages', 'size', 'tall_strips', 'width', 'viewport', 'workers', 'queue_depth',
+                           'image_cache_mb', 'quality', 'trace'):
+                value = getattr(args, option)
+                if value is not None:
+                    command += [f"--{option.replace('_', '-')}", str(value)]
+            output = subprocess.run(command, capture_output=True, text=True)
+            if output.returncode != 0:
+                sys.stderr.write(output.stderr)
+                sys.exit(f"Scenario {fmt} failed")
+            metrics = json.loads(output.stdout)
+            results['scenarios'][fmt] = metrics
+            rss = metrics['peak_rss_mb']
+            print(f"{fmt:<8} {metrics['pages']:>5} {metrics['ttfp_ms']:>8.1f} {metrics['visible_ms']:>8.1f} "
+                  f"{metrics['full_load_ms']:>9.1f} {metrics['zoom_ms']:>8.1f} {metrics['warm_ttfp_ms']:>8.1f} "
+                  f"{metrics['cache_hit_rate']:>8.1%} {metrics['fling_ms']:>8.1f} "
+                  f"{'-' if rss is None else f'{rss:.0f}':>7}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""Mesure du temps passé dans chaque étape du rendu des pages.
+
+Les étapes (ouverture du fichier, décodage, redimensionnement, création du
+PhotoImage, création de l'item du canvas) sont enregistrées comme des
+intervalles et les événements de cache comme des instants, au format des
+événements Chrome trace. Ils sont transmis aux fonctions enregistrées avec
+add_hook() ; Recorder en garde une copie exportable en JSON ou pour
+chrome://tracing et Perfetto.
+
+Sans hook, l'instrumentation est désactivée : span() retourne un contexte
+vide partagé et les appelants testent `instrumentation.enabled` avant de
+construire un événement.
+
+Les travaux confiés à un DecodePool sont exécutés par traced_call() : les
+événements produits dans le worker (thread ou processus) sont renvoyés avec
+le résultat, puis rejoués sur le thread principal par replay().
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+enabled = False  # True tant qu'au moins un hook est enregistré
+
+_hooks = []
+_local = threading.local()  # events : liste des événements capturés par traced_call
+_NULL_SPAN = nullcontext()
+
+
+def add_hook(hook):
+    """Enregistre hook(event), appelé sur le thread principal pour chaque événement"""
+    global enabled
+    if hook not in _hooks:
+        _hooks.append(hook)
+    enabled = True
+
+
+def remove_hook(hook):
+    global enabled
+    if hook in _hooks:
+        _hooks.remove(hook)
+    enabled = bool(_hooks)
+
+
+def now_us():
+    return time.perf_counter_ns() // 1000
+
+
+def _emit(event):
+    events = getattr(_local, 'events', None)
+    if events is not None:
+        events.append(event)
+        return
+    for hook in list(_hooks):
+        hook(event)
+
+
+class _Span:
+    __slots__ = ('name', 'args', 'start')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        _emit({'name': self.name, 'ph': 'X', 'ts': self.start // 1000, 'dur': (end - self.start) / 1000,
+               'pid': os.getpid(), 'tid': threading.get_ident(), 'args': self.args})
+        return False
+
+
+def span(name, **args):
+    """Contexte qui mesure une étape ; ne fait rien quand l'instrumentation est désactivée"""
+    if enabled or getattr(_local, 'events', None) is not None:
+        return _Span(name, args)
+    return _NULL_SPAN
+
+
+def event(name, **args):
+    """Enregistre un événement instantané (succès ou échec de cache...)"""
+    if enabled or getattr(_local, 'events', None) is not None:
+        _emit({'name': name, 'ph': 'i', 's': 't', 'ts': now_us(), 'pid': os.getpid(),
+               'tid': threading.get_ident(), 'args': args})
+
+
+def traced_call(func, *args):
+    """Exécute func(*args) en capturant ses événements ; retourne (résultat, événements)"""
+    events = _local.events = []
+    try:
+        return func(*args), events
+    finally:
+        _local.events = None
+
+
+def replay(events):
+    """Transmet aux hooks les événements capturés dans un worker"""
+    for item in events:
+        _emit(item)
+
+
+class Recorder:
+    """Hook qui garde les derniers événements et les exporte.
+
+    Les étapes rattachées à une page portent son chemin dans args['page'] ;
+    page_summary() en fait la somme par page et par étape.
+    """
+    def __init__(self, max_events=200000):
+        self.events = deque(maxlen=max_events)
+
+    def __call__(self, event):
+        self.events.append(event)
+
+    def clear(self):
+        self.events.clear()
+
+    def page_summary(self):
+        """{page: {étape: millisecondes}} pour les intervalles rattachés à une page"""
+        pages = {}
+        for item in self.events:
+            page = item['args'].get('page')
+            if item['ph'] != 'X' or page is None:
+                continue
+            stages = pages.setdefault(page, {})
+            stages[item['name']] = stages.get(item['name'], 0.0) + item['dur'] / 1000
+        return pages
+
+    def stage_totals(self):
+        """{étape: (nombre, millisecondes)} pour tous les intervalles"""
+        totals = {}
+        for item in self.events:
+            if item['ph'] != 'X':
+                continue
+            count, total = totals.get(item['name'], (0, 0.0))
+            totals[item['name']] = (count + 1, total + item['dur'] / 1000)
+        return totals
+
+    def counts(self):
+        """Nombre d'occurrences de chaque événement instantané"""
+        counts = {}
+        for item in self.events:
+            if item['ph'] == 'i':
+                counts[item['name']] = counts.get(item['name'], 0) + 1
+        return counts
+
+    def save_json(self, path):
+        data = {
+            'pages': self.page_summary(),
+            'stages': {name: {'count': count, 'ms': total} for name, (count, total) in self.stage_totals().items()},
+            'events': self.counts(),
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+    def save_chrome_trace(self, path):
+        """Fichier lisible par chrome://tracing et ui.perfetto.dev"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': list(self.events), 'displayTimeUnit': 'ms'}, f)
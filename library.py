@@ -0,0 +1,292 @@
+"""Index de la bibliothèque : dossiers, sous-dossiers, archives et pages de chaque chapitre.
+
+L'index est construit avec os.scandir (un seul parcours par dossier, en
+s'appuyant sur le type mis en cache dans chaque DirEntry), enregistré dans
+le dossier de cache et revalidé à l'ouverture suivante grâce à la date de
+modification des dossiers : seuls les dossiers modifiés sont relus.
+"""
+import hashlib
+import json
+import os
+import re
+
+from archives import archive_extensions, list_archive_members, make_page_path
+from reader_engine import VIDEO_EXTENSIONS, default_cache_dir
+
+_DIGITS = re.compile(r'([0-9]+)')
+
+
+def natural_sort_key(s):
+    """Clé de tri naturel des noms de fichiers (01.jpg vient avant 10.jpg)"""
+    return [int(text) if text.isdigit() else text.lower() for text in _DIGITS.split(s)]
+
+
+class FolderEntry:
+    """Contenu indexé d'un dossier : sous-dossiers, fichiers média et archives, triés"""
+    __slots__ = ('mtime_ns', 'dirs', 'media', 'archives')
+
+    def __init__(self, mtime_ns, dirs, media, archives=()):
+        self.mtime_ns = mtime_ns
+        self.dirs = dirs
+        self.media = media
+        self.archives = list(archives)
+
+    def to_json(self):
+        return {'mtime_ns': self.mtime_ns, 'dirs': self.dirs, 'media': self.media, 'archives': self.archives}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data['mtime_ns'], data['dirs'], data['media'], data['archives'])
+
+
+class LibraryIndex:
+    """Index persistant d'une bibliothèque.
+
+    Les méthodes folder() et media_paths() ne font aucun accès au système de
+    fichiers ; scan_folder() lit un seul dossier et refresh() revalide tout
+    l'arbre. refresh() peut tourner dans un thread : il construit un nouveau
+    dictionnaire sans modifier celui qu'utilise l'interface.
+    """
+    VERSION = 2
+
+    def __init__(self, root, extensions, index_path=None):
+        self.root = os.path.abspath(root)
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.archive_extensions = archive_extensions()
+        # Les vidéos ne sont pas lues depuis une archive
+        self.archive_page_extensions = tuple(ext for ext in self.extensions if ext not in VIDEO_EXTENSIONS)
+        if index_path is None:
+            digest = hashlib.sha1(self.root.encode('utf-8', 'surrogatepass')).hexdigest()[:16]
+            index_path = os.path.join(default_cache_dir(), 'library', f"{digest}.json")
+        self.index_path = index_path
+        self.folders = {}  # chemin absolu -> FolderEntry
+        self.archives = {}  # chemin de l'archive -> {'mtime_ns', 'size', 'pages'}
+
+    def load(self):
+        """Charge l'index enregistré ; retourne False s'il est absent ou illisible"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != self.VERSION or data.get('root') != self.root:
+                return False
+            self.folders = {path: FolderEntry.from_json(entry) for path, entry in data['folders'].items()}
+            self.archives = data['archives']
+            return True
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+    def save(self, folders=None):
+        """Enregistre l'index de façon atomique (fichier temporaire puis renommage)"""
+        folders = self.folders if folders is None else folders
+        data = {
+            'version': self.VERSION,
+            'root': self.root,
+            'extensions': list(self.extensions),
+            'folders': {path: entry.to_json() for path, entry in folders.items()},
+            'archives': dict(self.archives),  # Copie : l'interface peut en ajouter pendant l'écriture
+        }
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
+
+    def folder(self, path):
+        """Entrée indexée d'un dossier, ou None ; aucun accès disque"""
+        return self.folders.get(os.path.abspath(path))
+
+    def media_paths(self, path):
+        """Chemins complets des pages d'un dossier indexé, en ordre naturel"""
+        entry = self.folder(path)
+        if entry is None:
+            return []
+        return [os.path.join(path, name) for name in entry.media]
+
+    def archive_pages(self, archive_path):
+        """Pages d'une archive (chemins virtuels) en ordre naturel.
+
+        La liste est lue dans le répertoire central de l'archive puis gardée
+        dans l'index tant que la date et la taille de l'archive ne changent pas.
+        """
+        archive_path = os.path.abspath(archive_path)
+        stat = os.stat(archive_path)
+        cached = self.archives.get(archive_path)
+        if cached is None or cached['mtime_ns'] != stat.st_mtime_ns or cached['size'] != stat.st_size:
+            members = list_archive_members(archive_path, self.archive_page_extensions)
+            members.sort(key=natural_sort_key)
+            cached = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'pages': members}
+            self.archives[archive_path] = cached
+        return [make_page_path(archive_path, member) for member in cached['pages']]
+
+    def next_chapter(self, chapter_path):
+        """Chapitre qui suit un dossier ou une archive parmi ses voisins, en ordre naturel.
+
+        Les dossiers et les archives du même dossier parent sont triés
+        ensemble ; ceux qui ne contiennent aucune page sont sautés. Retourne
+        (chemin, pages) ou (None, []) s'il n'y a pas de chapitre suivant. La
+        recherche ne sort jamais de la bibliothèque : la racine n'a pas de suite.
+        """
+        chapter_path = os.path.abspath(chapter_path)
+        parent = os.path.dirname(chapter_path)
+        if parent != self.root and not parent.startswith(os.path.join(self.root, '')):
+            return None, []
+        entry = self.ensure_folder(parent)
+        siblings = sorted([(name, False) for name in entry.dirs] + [(name, True) for name in entry.archives],
+                          key=lambda sibling: natural_sort_key(sibling[0]))
+        names = [name for name, _ in siblings]
+        name = os.path.basename(chapter_path)
+        if name not in names:
+            return None, []
+        for sibling, is_archive in siblings[names.index(name) + 1:]:
+            path = os.path.join(parent, sibling)
+            try:
+                if is_archive:
+                    pages = self.archive_pages(path)
+                else:
+                    self.ensure_folder(path)
+                    pages = self.media_paths(path)
+            # Dossier inaccessible ou archive illisible : on passe au suivant
+            except Exception:
+                continue
+            if pages:
+                return path, pages
+        return None, []
+
+    def scan_folder(self, path, mtime_ns=None):
+        """Lit un dossier avec un seul os.scandir et met à jour son entrée"""
+        path = os.path.abspath(path)
+        entry = self._read_folder(path, mtime_ns)[0]
+        self.folders[path] = entry
+        return entry
+
+    def ensure_folder(self, path):
+        """Entrée d'un dossier, lue sur le disque seulement si elle n'est pas indexée"""
+        return self.folder(path) or self.scan_folder(path)
+
+    def _read_folder(self, path, mtime_ns=None):
+        """Retourne (FolderEntry, {chemin du sous-dossier: mtime})"""
+        dirs, media, archives, child_mtimes = [], [], [], {}
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        dirs.append(entry.name)
+                        # Gratuit sous Windows, un stat sous Unix
+                        child_mtimes[entry.path] = entry.stat().st_mtime_ns
+                    else:
+                        name = entry.name.lower()
+                        if name.endswith(self.extensions) and entry.is_file():
+                            media.append(entry.name)
+                        elif name.endswith(self.archive_extensions) and entry.is_file():
+                            archives.append(entry.name)
+                except OSError:
+                    continue
+        if mtime_ns is None:
+            mtime_ns = os.stat(path).st_mtime_ns
+        dirs.sort(key=natural_sort_key)
+        media.sort(key=natural_sort_key)
+        archives.sort(key=natural_sort_key)
+        return FolderEntry(mtime_ns, dirs, media, archives), child_mtimes
+
+    def refresh(self):
+        """Revalide tout l'arbre ; retourne (nouveaux dossiers, nombre de dossiers relus).
+
+        Un dossier dont la date de modification n'a pas changé est repris de
+        l'index sans être relu ; seuls ses sous-dossiers sont vérifiés.
+        """
+        folders = {}
+        rescanned = 0
+        try:
+            stack = [(self.root, os.stat(self.root).st_mtime_ns)]
+        except OSError:
+            return folders, rescanned
+        while stack:
+            path, mtime_ns = stack.pop()
+            known = self.folders.get(path)
+            if known is not None and known.mtime_ns == mtime_ns:
+                entry = known
+                children = []
+                for name in entry.dirs:
+                    child = os.path.join(path, name)
+                    try:
+                        children.append((child, os.stat(child).st_mtime_ns))
+                    except OSError:
+                        continue
+            else:
+                try:
+                    entry, child_mtimes = self._read_folder(path, mtime_ns)
+                except OSError:
+                    continue
+                rescanned += 1
+                children = list(child_mtimes.items())
+            folders[path] = entry
+            stack.extend(children)
+        return folders, rescanned
+
+
+class TitleIndex:
+    """Index de recherche en mémoire des dossiers et archives d'une bibliothèque.
+
+    Les entrées sont repérées par leur chemin relatif à la racine et numérotées
+    dans l'ordre naturel de ces chemins : des résultats triés par numéro sont
+    triés naturellement, une série avant ses chapitres. Les mots recherchés
+    d'au moins trois caractères passent par un index de trigrammes ; les plus
+    courts, qui recoupent de toute façon une grande partie de la bibliothèque,
+    sont cherchés par un simple parcours des chemins.
+    """
+    def __init__(self, entries):
+        self.entries = sorted(entries, key=lambda entry: natural_sort_key(entry[0]))  # [(chemin relatif, type, chemin)]
+        self._texts = [entry[0].lower() for entry in self.entries]
+        self._trigrams = {}  # trigramme -> numéros des entrées, croissants
+        for number, text in enumerate(self._texts):
+            for gram in {text[i:i + 3] for i in range(len(text) - 2)}:
+                self._trigrams.setdefault(gram, []).append(number)
+
+    @classmethod
+    def from_folders(cls, root, folders):
+        """Construit l'index à partir des dossiers d'un LibraryIndex (sans accès disque)"""
+        # Les chemins de l'index commencent tous par la racine : un découpage suffit (os.path.relpath est lent)
+        start = len(os.path.join(root, ''))
+        entries = []
+        for path, entry in folders.items():
+            if path != root:
+                entries.append((path[start:], 'directory', path))
+            for name in entry.archives:
+                archive_path = os.path.join(path, name)
+                entries.append((archive_path[start:], 'archive', archive_path))
+        return cls(entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _matches(self, token):
+        """Numéros des entrées dont le chemin contient le mot"""
+        if len(token) < 3:
+            return {number for number, text in enumerate(self._texts) if token in text}
+        postings = []
+        for i in range(len(token) - 2):
+            numbers = self._trigrams.get(token[i:i + 3])
+            if numbers is None:
+                return set()
+            postings.append(numbers)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for numbers in postings[1:]:
+            candidates.intersection_update(numbers)
+            if not candidates:
+                return candidates
+        # Les trigrammes peuvent être présents sans former le mot : vérification finale
+        return {number for number in candidates if token in self._texts[number]}
+
+    def search(self, query):
+        """Entrées qui contiennent tous les mots de la requête, en ordre naturel"""
+        tokens = query.lower().split()
+        if not tokens:
+            return []
+        # Le mot le plus long, a priori le plus sélectif, passe par l'index ; les autres filtrent ses résultats
+        tokens.sort(key=len, reverse=True)
+        result = self._matches(tokens[0])
+        texts = self._texts
+        for token in tokens[1:]:
+            result = [number for number in result if token in texts[number]]
+        return [self.entries[number] for number in sorted(result)]
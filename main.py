@@ -1,24 +1,107 @@
+import time
+
+_STARTED = time.perf_counter()  # Référence du rapport de démarrage
+
 import os
+import queue
+import threading
 import tkinter as tk
 from tkinter import ttk, filedialog
-from PIL import Image, ImageTk
-import vlc  # Pour la lecture des fichiers WebM
+# Pillow (ImageTk) et python-vlc sont importés à leur première utilisation
+import instrumentation
+import resources
+from archives import close_thread_archives, page_container, split_page_path
+from library import LibraryIndex, TitleIndex
+from reader_engine import (RESAMPLING_MODES, DecodePool, ImageCache, ReaderEngine, bucket_width, default_cache_dir,
+                           get_disk_cache, load_chapter_layout, read_page_header, render_scaled)
+from video import VideoBackend
+
+SUPPORTED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webm', '.webp')
+DISK_CACHE_FILE = 'pages.sqlite3'  # Dans default_cache_dir()
+MANIFEST_DIR = 'chapters'  # Manifestes des chapitres, dans default_cache_dir()
+DEFAULT_READING_WIDTH = 880  # Largeur de lecture de la fenêtre par défaut (1200 px moins le panneau de 300 px)
+DEFAULT_MEMORY_CEILING_MB = 2048  # Plafond de mémoire résidente avant dégradation ; 0 le désactive
+
 
 class MangaReader:
-    def __init__(self, root):
+    def __init__(self, root, decode_workers=None, decode_mode='thread', decode_queue_depth=8,
+                 image_cache_bytes=256 * 1024 * 1024, disk_cache=True, resampling='fast',
+                 memory_ceiling_mb=DEFAULT_MEMORY_CEILING_MB, disk_cache_bytes=None):
         self.root = root
         self.root.title("Manhwa Reader")
         self.root.geometry("1200x800")
         self.current_image = None
         self.image_label = None
-        self.video_player = None
+        self.video = VideoBackend()  # Instance VLC unique, chargée à la première vidéo
+        self.video_frame = None
+        self.video_window = None
         self.is_video_playing = False
         self.images = []
         self.current_image_index = -1
-        self.image_cache = {}  # Cache dictionary
+        self.image_cache = ImageCache(image_cache_bytes)  # Cache LRU borné en mémoire
         self.read_button = None
-        self.supported_extensions = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webm', '.webp')
+        self.supported_extensions = SUPPORTED_EXTENSIONS
+        self.library = None  # Index de la bibliothèque ouverte (library.LibraryIndex)
+        self.title_index = None  # Index de recherche (library.TitleIndex), construit avec l'index
+        
+        # Recherche : les résultats sont insérés dans l'arbre par lots, au fil du défilement
+        self.search_delay = 60  # ms sans frappe avant de lancer la recherche
+        self.search_batch = 100  # Lignes insérées à la fois
+        self.search_results = []
+        self._search_shown = 0
+        self._searching = False
+        self._search_after = None
         
+        # Décodage en arrière-plan : les pixels arrivent au thread Tk via root.after
+        self.decode_pool = DecodePool(workers=decode_workers, mode=decode_mode, max_pending=decode_queue_depth)
+        self.decode_poll_interval = 15  # ms
+        self._decode_poll_scheduled = False
+        self._single_image_path = None
+        self._animation_after = None
+
+        # Cache disque des pages redimensionnées, partagé entre les sessions
+        self.disk_cache_path = os.path.join(default_cache_dir(), DISK_CACHE_FILE) if disk_cache else None
+        if self.disk_cache_path and disk_cache_bytes:
+            get_disk_cache(self.disk_cache_path).set_max_bytes(disk_cache_bytes)
+        
+        # Qualité de redimensionnement : 'exact' (LANCZOS sur l'original) ou 'fast' (décodage réduit)
+        self.resampling = tk.StringVar(self.root, value=resampling)
+        
+        # Vue virtualisée du chapitre : seules les pages proches du viewport sont décodées.
+        # Le moteur ne dépend pas de Tk ; cette classe lui sert de vue (voir reader_engine.ReaderEngine)
+        manifest_dir = os.path.join(default_cache_dir(), MANIFEST_DIR) if disk_cache else None
+        self.engine = ReaderEngine(self, self.decode_pool, self.image_cache, self.disk_cache_path, resampling,
+                                   manifest_dir=manifest_dir)
+        self.reading_images = []
+        self._visible_update_pending = False
+        self.zoom_settle_delay = 250  # ms sans événement de zoom avant le rendu de qualité
+        self._zoom_refine_after = None
+        self.reflow_delay = 150  # ms sans redimensionnement de la fenêtre avant la remise en page
+        self._reflow_after = None
+        
+        # Lecture continue : le chapitre suivant est ajouté à la suite quand on approche de la fin
+        self.continuous_reading = tk.BooleanVar(self.root, value=True)
+        self.chapter_prefetch_margin = 3.0  # En hauteurs de viewport avant la fin du dernier chapitre
+        self.chapters_kept_behind = 1  # Chapitres déjà lus gardés au-dessus du chapitre courant
+        self._next_chapter_request = None  # Chapitre dont on cherche la suite
+        self._last_chapter = None  # Dernier chapitre de la série, sans suite
+        
+        # Mesures de performance : enregistrement des étapes et affichage dans la barre d'état
+        self.timing_recorder = instrumentation.Recorder()
+        self.record_timings = tk.BooleanVar(self.root, value=False)
+        self.show_perf_overlay = tk.BooleanVar(self.root, value=False)
+        self.overlay_refresh_interval = 0.5  # s
+        self._overlay_after = None
+        self._frame_last = 0.0
+        self._frame_worst = 0.0
+        self._overlay_next_refresh = 0.0
+
+        # Plafond de mémoire : au-delà des seuils, le lecteur réduit ses caches et son préchargement
+        self.memory_governor = resources.MemoryGovernor(memory_ceiling_mb * 1024 * 1024)
+        self.memory_check_interval = 1000  # ms
+        self._memory_after = None
+        self._resampling_before_degrade = None  # Qualité choisie avant le passage forcé en 'fast'
+
         # Variables pour le zoom
         self.zoom_level = 1.0
         self.is_fullscreen = False
@@ -29,6 +112,8 @@ class MangaReader:
         
         # Bindings clavier et souris
         self.setup_bindings()
+        if memory_ceiling_mb:
+            self._memory_after = self.root.after(self.memory_check_interval, self._memory_tick)
         
     def setup_bindings(self):
         """Configure tous les raccourcis clavier et les actions de la souris"""
@@ -37,6 +122,10 @@ class MangaReader:
         self.root.bind('<Right>', self.next_image)
         self.root.bind('<Up>', lambda e: self.canvas.yview_scroll(-3, "units"))
         self.root.bind('<Down>', lambda e: self.canvas.yview_scroll(3, "units"))
+        self.root.bind('<Prior>', lambda e: self.go_to_page(self.current_page() - 1))
+        self.root.bind('<Next>', lambda e: self.go_to_page(self.current_page() + 1))
+        self.root.bind('<Home>', lambda e: self.go_to_page(0))
+        self.root.bind('<End>', lambda e: self.go_to_page(len(self.engine.slots) - 1))
         
         # Zoom
         self.root.bind('<Control-plus>', lambda e: self.zoom_in())
@@ -51,7 +140,7 @@ class MangaReader:
     def zoom_in(self, factor=1.2):
         """Zoom avant"""
         self.zoom_level *= factor
-        if self.comics_frame:
+        if self.engine.slots:
             self.apply_zoom()
         print(f"Zoom: {self.zoom_level:.2f}x")
         self.update_status(f"Zoom: {self.zoom_level:.2f}x")
@@ -61,7 +150,7 @@ class MangaReader:
         self.zoom_level /= factor
         if self.zoom_level < 0.1:
             self.zoom_level = 0.1
-        if hasattr(self, 'comics_frame'):
+        if self.engine.slots:
             self.apply_zoom()
         print(f"Zoom: {self.zoom_level:.2f}x")
         self.update_status(f"Zoom: {self.zoom_level:.2f}x")
@@ -69,27 +158,78 @@ class MangaReader:
     def reset_zoom(self):
         """Réinitialise le zoom à 100%"""
         self.zoom_level = 1.0
-        if hasattr(self, 'comics_frame'):
+        if self.engine.slots:
             self.apply_zoom()
         print("Zoom reset to 100%")
         self.update_status("Zoom reset to 100%")
             
-    def apply_zoom(self):
-        """Applique le niveau de zoom actuel aux images"""
-        if not hasattr(self, 'comics_frame') or not self.images:
+    def reading_width(self):
+        """Largeur d'affichage des pages : largeur du canvas moins la marge, zoom compris"""
+        base_width = self.canvas.winfo_width() - 20
+        if base_width <= 0:
+            base_width = 800
+        return max(1, int(base_width * self.zoom_level))
+
+    def apply_zoom(self, settle_delay=None):
+        """Applique le niveau de zoom actuel aux images.
+
+        La mise en page est recalculée immédiatement et les pages visibles sont
+        agrandies à partir des pixels déjà décodés ; le rendu LANCZOS n'est
+        relancé qu'une fois la rafale d'événements de zoom terminée, après
+        settle_delay ms (zoom_settle_delay par défaut).
+        """
+        if not self.engine.slots or not self.images:
             return
             
         # Recalculer la largeur avec zoom
-        base_width = self.canvas.winfo_width() - 20
-        zoomed_width = int(base_width * self.zoom_level)
+        zoomed_width = self.reading_width()
+        if zoomed_width == self.engine.width:
+            return
         
-        # Supprimer et recréer tous les widgets dans comics_frame
-        for widget in self.comics_frame.winfo_children():
-            widget.destroy()
-            
-        # Recréer les images avec le nouveau zoom
-        self.start_reading(force_reload=True, custom_width=zoomed_width)
-            
+        # Garder la même page sous le haut de l'écran ; aperçu rapide des pages
+        # visibles, les autres sont libérées
+        self.engine.settling = True
+        view_top = self.engine.relayout(zoomed_width, self.canvas.canvasy(0), self.canvas.winfo_height())
+        total_height = self.engine.total_height
+        self._redraw_chapter()
+        self.canvas.configure(scrollregion=(0, 0, zoomed_width, total_height))
+        self.canvas.yview_moveto(view_top / max(total_height, 1))
+        
+        # Affiner une fois les événements de zoom terminés
+        if self._zoom_refine_after is not None:
+            self.root.after_cancel(self._zoom_refine_after)
+        if settle_delay is None:
+            settle_delay = self.zoom_settle_delay
+        self._zoom_refine_after = self.root.after(settle_delay, self._refine_zoom)
+
+    def _refine_zoom(self):
+        """Relance le rendu de qualité des pages visibles une fois le zoom stabilisé"""
+        self._zoom_refine_after = None
+        self.engine.settling = False
+        self._schedule_visible_update()
+
+    def on_resampling_change(self):
+        """Recalcule les pages affichées avec la nouvelle qualité de redimensionnement"""
+        self.update_status(f"Resampling: {self.resampling.get()}")
+        self.engine.quality = self.resampling.get()
+        if not self.engine.slots:
+            return
+        self.engine.refresh()
+        self._schedule_visible_update()
+
+    def current_page(self):
+        """Index de la page affichée en haut de l'écran"""
+        return self.engine.page_at(self.canvas.canvasy(0))
+
+    def go_to_page(self, index):
+        """Fait défiler le chapitre jusqu'au début d'une page"""
+        if not self.engine.slots:
+            return
+        index = min(max(index, 0), len(self.engine.slots) - 1)
+        total_height = max(self.engine.total_height, 1)
+        self.canvas.yview_moveto(self.engine.slots[index].top / total_height)
+        self.update_status(f"Page {index + 1}/{len(self.engine.slots)}")
+
     def on_zoom_mousewheel(self, event):
         """Zoom avec Ctrl+molette de souris"""
         if event.delta > 0:
@@ -122,40 +262,37 @@ class MangaReader:
 
     def display_image(self, path):
         # Arrêter une vidéo en cours si nécessaire
-        if self.is_video_playing and self.video_player:
-            self.video_player.stop()
-            self.is_video_playing = False
+        self._stop_video()
             
         # Nettoyer l'affichage précédent
         if self.image_label:
             self.image_label.destroy()
+            self.image_label = None
+        self._single_image_path = None
+        self.engine.animations.stop('single')
+        self._clear_chapter_view()
         
         # Vérifier si c'est un fichier WebM (vidéo)
         if path.lower().endswith('.webm'):
+            if not self.video.available:
+                self.update_status(f"{self.video.error} - {os.path.basename(path)}")
+                return
             try:
                 # Créer un cadre pour le lecteur vidéo
                 self.video_frame = tk.Frame(self.canvas, bg='#1e1e1e', bd=0, highlightthickness=0)
                 video_width = self.canvas.winfo_width() - 20
                 video_height = video_width * 9 // 16  # Aspect ratio 16:9
                 
-                self.canvas.create_window((10, 10), window=self.video_frame, anchor='nw', 
-                                         width=video_width, 
-                                         height=video_height)
-                
-                # Initialiser le lecteur VLC
-                self.instance = vlc.Instance()
-                self.video_player = self.instance.media_player_new()
-                media = self.instance.media_new(path)
-                self.video_player.set_media(media)
+                self.video_window = self.canvas.create_window((10, 10), window=self.video_frame, anchor='nw',
+                                                              width=video_width,
+                                                              height=video_height)
                 
-                # Intégrer VLC dans tkinter
-                if os.name == "nt":  # Windows
-                    self.video_player.set_hwnd(self.video_frame.winfo_id())
-                else:  # Linux, MacOS
-                    self.video_player.set_xwindow(self.video_frame.winfo_id())
-                    
-                # Démarrer la lecture
-                self.video_player.play()
+                # Le lecteur VLC partagé est intégré dans le cadre tkinter
+                self.canvas.update_idletasks()
+                if not self.video.play(path, self.video_frame.winfo_id()):
+                    self._stop_video()
+                    self.update_status(f"{self.video.error} - {os.path.basename(path)}")
+                    return
                 self.is_video_playing = True
                 
                 # Mettre à jour le scrollregion
@@ -167,45 +304,273 @@ class MangaReader:
                 self.update_status(f"Error: {str(e)}")
                 
         else:
-            try:
-                # C'est une image, utiliser le code existant
-                img = Image.open(path)
-                
-                # Calculer les dimensions pour l'affichage
-                display_width = self.canvas.winfo_width() - 20
-                if display_width <= 0:  # Éviter la division par zéro
-                    display_width = 800
-                    
-                # Appliquer le zoom
-                display_width = int(display_width * self.zoom_level)
-                
-                # Redimensionner l'image en préservant le ratio
-                ratio = display_width / img.width
-                display_height = int(img.height * ratio)
-                
-                # Générer une clé de cache avec le chemin et les dimensions
-                cache_key = (path, display_width)
-                
-                # Vérifier le cache d'abord
-                if cache_key not in self.image_cache:
-                    resized_img = img.resize((display_width, display_height), Image.LANCZOS)
-                    self.image_cache[cache_key] = ImageTk.PhotoImage(resized_img)
-                
-                self.current_image = self.image_cache[cache_key]
-                self.image_label = tk.Label(self.canvas, image=self.current_image, bg='#1e1e1e', bd=0, highlightthickness=0)
+            # Calculer les dimensions pour l'affichage, zoom compris
+            display_width = self.reading_width()
+            
+            # Générer une clé de cache avec le chemin, les dimensions et la qualité
+            cache_key = (path, display_width, self.resampling.get())
+            self._single_image_path = path
+            
+            # Vérifier le cache d'abord, sinon décoder en arrière-plan
+            photo = self.image_cache.get(cache_key)
+            if photo is not None:
+                self._show_single_image(cache_key, photo)
+            else:
+                self.update_status(f"Loading: {os.path.basename(path)}")
+                self.decode_pool.submit(('single',) + cache_key,
+                                        lambda result, error: self._on_single_image_decoded(cache_key, result, error),
+                                        render_scaled, path, display_width, None, bucket_width(display_width),
+                                        self.disk_cache_path, cache_key[2])
+                self._schedule_decode_poll()
+
+    def _stop_video(self):
+        """Arrête la vidéo en cours et retire son cadre ; le lecteur VLC est gardé pour la suivante"""
+        self.video.stop()
+        self.is_video_playing = False
+        if self.video_window is not None:
+            self.canvas.delete(self.video_window)
+            self.video_window = None
+        if self.video_frame is not None:
+            self.video_frame.destroy()
+            self.video_frame = None
+
+    def _on_single_image_decoded(self, cache_key, result, error):
+        """Reçoit une image décodée par le pool pour l'affichage image par image"""
+        path = cache_key[0]
+        if error is not None:
+            print(f"Error displaying image: {error}")
+            self.update_status(f"Error: {str(error)}")
+            return
+        from PIL import Image, ImageTk
+
+        size, data = result
+        with instrumentation.span('photoimage', page=path):
+            photo = ImageTk.PhotoImage(Image.frombytes('RGB', size, data))
+        self.image_cache.put(cache_key, photo, *size)
+        # L'utilisateur a pu passer à une autre image entre-temps
+        if path == self._single_image_path:
+            self._show_single_image(cache_key, photo)
+
+    def _show_single_image(self, cache_key, photo):
+        path = cache_key[0]
+        try:
+            if self.image_label:
+                self.image_label.destroy()
+            self.current_image = photo
+            with instrumentation.span('widget', page=path):
+                self.image_label = tk.Label(self.canvas, image=self.current_image, bg='#1e1e1e', bd=0,
+                                            highlightthickness=0)
                 self.canvas.create_window((10, 10), window=self.image_label, anchor='nw')
-                
-                # Mettre à jour le scrollregion
-                self.canvas.update_idletasks()
-                self.canvas.configure(scrollregion=self.canvas.bbox('all'))
-                self.update_status(f"Image: {os.path.basename(path)}")
-            except Exception as e:
-                print(f"Error displaying image: {e}")
-                self.update_status(f"Error: {str(e)}")
+            
+            # Mettre à jour le scrollregion
+            self.canvas.update_idletasks()
+            self.canvas.configure(scrollregion=self.canvas.bbox('all'))
+            self.update_status(f"Image: {os.path.basename(path)}")
+            
+            # Les GIF et WEBP animés sont lus par le minuteur partagé des animations
+            if read_page_header(path)[0] == 'animation':
+                self.engine.animations.play('single', path, cache_key[1], cache_key[2], self._show_single_frame)
+                self._schedule_decode_poll()
+        except Exception as e:
+            print(f"Error displaying image: {e}")
+            self.update_status(f"Error: {str(e)}")
+
+    def _show_single_frame(self, photo):
+        """Affiche l'image suivante d'une image animée en mode image par image"""
+        if self.image_label:
+            self.current_image = photo
+            self.image_label.configure(image=photo)
+
+    def _schedule_decode_poll(self):
+        """Programme la récupération des résultats du pool tant qu'il reste du travail"""
+        if not self._decode_poll_scheduled and self.decode_pool.pending:
+            self._decode_poll_scheduled = True
+            self.root.after(self.decode_poll_interval, self._poll_decode_results)
+
+    def _poll_decode_results(self):
+        self._decode_poll_scheduled = False
+        self.decode_pool.drain()
+        self._schedule_decode_poll()
+
+    def show_cache_stats(self):
+        """Affiche les compteurs du cache d'images dans la barre d'état"""
+        stats = self.image_cache.stats()
+        message = (f"Image cache: {stats['entries']} images, {stats['bytes'] / 1048576:.0f}/"
+                   f"{stats['max_bytes'] / 1048576:.0f} MB - hits {stats['hits']}, misses {stats['misses']}, "
+                   f"evictions {stats['evictions']}")
+        print(message)
+        self.update_status(message)
+
+    def show_resource_usage(self):
+        """Affiche les ressources ouvertes et la mémoire du processus dans la barre d'état"""
+        live = resources.snapshot()
+        files, files_peak = live.get('file', (0, 0))
+        archives, archives_peak = live.get('archive', (0, 0))
+        cache = self.image_cache.stats()
+        frames = self.engine.animations.frames.stats()
+        rss = resources.rss_bytes()
+        message = (f"Open files {files} (peak {files_peak}), archives {archives} (peak {archives_peak}) - "
+                   f"Tk images {len(self.root.image_names())}, active tiles {len(self.engine.active_tiles)} - "
+                   f"image cache {cache['bytes'] / 1048576:.0f} MB, frames {frames['bytes'] / 1048576:.0f} MB - "
+                   f"RSS {'n/a' if rss is None else f'{rss / 1048576:.0f} MB'}, "
+                   f"memory mode: {self.memory_governor.name}")
+        print(message)
+        self.update_status(message)
+
+    def _memory_tick(self):
+        """Compare régulièrement la mémoire résidente au plafond et applique le niveau de dégradation"""
+        previous = self.memory_governor.level
+        level = self.memory_governor.update(resources.rss_bytes())
+        if level != previous:
+            self.apply_memory_level(level)
+        self._memory_after = self.root.after(self.memory_check_interval, self._memory_tick)
+
+    def apply_memory_level(self, level):
+        """Réduit (ou rétablit) caches, préchargement et qualité selon le niveau du MemoryGovernor"""
+        self.engine.set_memory_level(level)
+        # Les chapitres déjà lus ne sont plus gardés au-dessus du chapitre courant
+        self.chapters_kept_behind = 0 if level >= 2 else 1
+        if level >= 3 and self._resampling_before_degrade is None:
+            self._resampling_before_degrade = self.resampling.get()
+            if self._resampling_before_degrade != 'fast':
+                self.resampling.set('fast')
+                self.on_resampling_change()
+        elif level < 3 and self._resampling_before_degrade is not None:
+            resampling, self._resampling_before_degrade = self._resampling_before_degrade, None
+            if resampling != self.resampling.get():
+                self.resampling.set(resampling)
+                self.on_resampling_change()
+        rss = self.memory_governor.rss
+        message = (f"Memory {rss / 1048576:.0f}/{self.memory_governor.ceiling_bytes / 1048576:.0f} MB - "
+                   f"memory mode: {self.memory_governor.name}")
+        print(message)
+        self.update_status(message)
+
+    def on_record_timings_change(self):
+        """Active ou coupe l'enregistrement des temps de rendu"""
+        if self.record_timings.get():
+            self.timing_recorder.clear()
+            instrumentation.add_hook(self.timing_recorder)
+            self.update_status("Recording page timings")
+        else:
+            instrumentation.remove_hook(self.timing_recorder)
+            self.update_status(f"Timing recording stopped - {len(self.timing_recorder.events)} events")
+
+    def export_timings(self, chrome_trace=False):
+        """Enregistre les temps mesurés en résumé JSON ou au format Chrome trace"""
+        if not self.timing_recorder.events:
+            self.update_status("No timings recorded - enable View > Record Timings first")
+            return
+        title = "Export Chrome Trace" if chrome_trace else "Export Timings"
+        path = filedialog.asksaveasfilename(title=title, defaultextension='.json',
+                                            filetypes=[("JSON", "*.json")])
+        if not path:
+            return
+        try:
+            if chrome_trace:
+                self.timing_recorder.save_chrome_trace(path)
+            else:
+                self.timing_recorder.save_json(path)
+            self.update_status(f"Timings exported to {path}")
+        except OSError as e:
+            self.update_status(f"Error exporting timings: {e}")
+
+    def on_perf_overlay_change(self):
+        """Affiche ou masque les compteurs de performance dans la barre d'état"""
+        if self.show_perf_overlay.get():
+            self.perf_label.pack(side=tk.RIGHT, padx=5, pady=2, before=self.status_label)
+            self._frame_last = time.perf_counter()
+            self._frame_worst = 0.0
+            self._overlay_next_refresh = self._frame_last
+            self._overlay_tick()
+        else:
+            if self._overlay_after is not None:
+                self.root.after_cancel(self._overlay_after)
+                self._overlay_after = None
+            self.perf_label.pack_forget()
+
+    def _overlay_tick(self):
+        """Battement à ~60 Hz : le plus long écart entre deux battements mesure le temps de trame"""
+        now = time.perf_counter()
+        self._frame_worst = max(self._frame_worst, now - self._frame_last)
+        self._frame_last = now
+        if now >= self._overlay_next_refresh:
+            stats = self.image_cache.stats()
+            queue_stats = self.engine.queue_metrics()
+            view_height = max(self.canvas.winfo_height(), 1)
+            self.perf_label.config(text=f"Frame {self._frame_worst * 1000:.0f} ms | "
+                                        f"Decode {queue_stats['urgent_queued']} visible + "
+                                        f"{queue_stats['queued'] - queue_stats['urgent_queued']} queued, "
+                                        f"visible wait {queue_stats['urgent_wait_ms']:.0f} ms | "
+                                        f"Scroll {queue_stats['velocity'] / view_height:+.1f} screens/s, "
+                                        f"prefetch {queue_stats['prefetch_ahead']:.1f} ahead | "
+                                        f"Cache {stats['bytes'] / 1048576:.0f}/{stats['max_bytes'] / 1048576:.0f} MB"
+                                        + (f" | RSS {self.memory_governor.rss / 1048576:.0f} MB"
+                                           if self.memory_governor.rss is not None else "")
+                                        + (f" ({self.memory_governor.name})" if self.memory_governor.level else ""))
+            self._frame_worst = 0.0
+            self._overlay_next_refresh = now + self.overlay_refresh_interval
+        self._overlay_after = self.root.after(16, self._overlay_tick)
+
+    def report_startup(self, started, imported):
+        """Affiche le temps de démarrage une fois la première fenêtre dessinée"""
+        built = time.perf_counter()
+
+        def report():
+            shown = time.perf_counter()
+            message = (f"Ready - window shown in {(shown - started) * 1000:.0f} ms "
+                       f"(imports {(imported - started) * 1000:.0f} ms, "
+                       f"UI {(built - imported) * 1000:.0f} ms, first draw {(shown - built) * 1000:.0f} ms)")
+            print(message)
+            self.update_status(message)
+
+        # Les rappels d'inactivité sont traités après le dessin initial de la fenêtre
+        self.root.after_idle(report)
+
+    def on_close(self):
+        """Arrête les travaux de décodage avant de fermer la fenêtre"""
+        if self._overlay_after is not None:
+            self.root.after_cancel(self._overlay_after)
+        if self._reflow_after is not None:
+            self.root.after_cancel(self._reflow_after)
+        if self._search_after is not None:
+            self.root.after_cancel(self._search_after)
+        if self._memory_after is not None:
+            self.root.after_cancel(self._memory_after)
+        self._stop_video()
+        self.video.release()
+        if self._animation_after is not None:
+            self.root.after_cancel(self._animation_after)
+        self.engine.animations.stop_all()
+        self.decode_pool.shutdown()
+        self.root.destroy()
                 
     def on_canvas_configure(self, event):
         if self.image_label:
             self.canvas.configure(scrollregion=self.canvas.bbox('all'))
+        if self.engine.slots:
+            self._schedule_visible_update()
+        # Remise en page à la nouvelle largeur une fois la rafale de redimensionnements terminée
+        if self.engine.slots or self.image_label:
+            if self._reflow_after is not None:
+                self.root.after_cancel(self._reflow_after)
+            self._reflow_after = self.root.after(self.reflow_delay, self._reflow)
+
+    def _reflow(self):
+        """Adapte les pages affichées à la largeur du canvas après un redimensionnement ou le plein écran"""
+        self._reflow_after = None
+        if self.engine.slots:
+            # Le rendu de qualité suit immédiatement : il n'y a plus d'événement à attendre
+            self.apply_zoom(settle_delay=0)
+        elif self.image_label and self._single_image_path and self.current_image is not None:
+            if self.current_image.width() != self.reading_width():
+                self.display_image(self._single_image_path)
+
+    def on_canvas_yview(self, first, last):
+        """Synchronise la scrollbar et met à jour les pages visibles"""
+        self.scrollbar.set(first, last)
+        if self.engine.slots:
+            self._schedule_visible_update()
     
     def on_mousewheel(self, event):
         """Gestion améliorée du défilement avec la molette de souris"""
@@ -243,6 +608,15 @@ class MangaReader:
         self.open_button = ttk.Button(self.tree_header, text="📂", width=3, command=self.open_directory)
         self.open_button.pack(side=tk.RIGHT, padx=5)
         
+        # Champ de recherche sur les dossiers et archives de la bibliothèque
+        self.search_var = tk.StringVar(self.root)
+        self.search_entry = ttk.Entry(self.left_frame, textvariable=self.search_var)
+        self.search_entry.pack(fill=tk.X, padx=10, pady=(0, 5))
+        # Les raccourcis de lecture de la fenêtre (flèches, Début, Fin...) ne s'appliquent pas à la saisie
+        self.search_entry.bindtags((self.search_entry, 'TEntry', 'all'))
+        self.search_entry.bind('<Escape>', lambda e: self.search_var.set(''))
+        self.search_var.trace_add('write', self.on_search_change)
+        
         # Create treeview
         self.tree_frame = ttk.Frame(self.left_frame)
         self.tree_frame.pack(fill=tk.BOTH, expand=True)
@@ -253,7 +627,7 @@ class MangaReader:
         # Add scrollbar to treeview
         self.tree_scrollbar = ttk.Scrollbar(self.tree_frame, orient="vertical", command=self.tree.yview)
         self.tree_scrollbar.pack(side="right", fill="y")
-        self.tree.configure(yscrollcommand=self.tree_scrollbar.set)
+        self.tree.configure(yscrollcommand=self.on_tree_yview)
         
         # Button frame for the left panel
         self.left_button_frame = ttk.Frame(self.left_frame)
@@ -298,7 +672,7 @@ class MangaReader:
         # Add scrollbar
         self.scrollbar = ttk.Scrollbar(self.canvas_frame, orient="vertical", command=self.canvas.yview)
         self.scrollbar.pack(side="right", fill="y")
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.canvas.configure(yscrollcommand=self.on_canvas_yview)
         
         # Barre d'état en bas
         self.status_frame = ttk.Frame(self.root)
@@ -307,6 +681,9 @@ class MangaReader:
         self.status_label = ttk.Label(self.status_frame, text="Ready", anchor=tk.W, relief=tk.SUNKEN)
         self.status_label.pack(fill=tk.X, padx=5, pady=2)
         
+        # Compteurs de performance, affichés à droite de la barre d'état à la demande
+        self.perf_label = ttk.Label(self.status_frame, text="", anchor=tk.E, relief=tk.SUNKEN)
+        
         self.canvas.bind('<Configure>', self.on_canvas_configure)
         self.canvas.bind_all('<MouseWheel>', self.on_mousewheel)
 
@@ -323,7 +700,8 @@ class MangaReader:
         self.menu.add_cascade(label="File", menu=self.file_menu)
         self.file_menu.add_command(label="Open Directory", command=self.open_directory)
         self.file_menu.add_separator()
-        self.file_menu.add_command(label="Exit", command=self.root.quit)
+        self.file_menu.add_command(label="Exit", command=self.on_close)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Menu Affichage
         self.view_menu = tk.Menu(self.menu, tearoff=0)
@@ -333,6 +711,22 @@ class MangaReader:
         self.view_menu.add_command(label="Reset Zoom", command=self.reset_zoom)
         self.view_menu.add_separator()
         self.view_menu.add_command(label="Fullscreen", command=self.toggle_fullscreen)
+        self.view_menu.add_checkbutton(label="Continuous Reading", variable=self.continuous_reading)
+        self.view_menu.add_separator()
+        self.view_menu.add_radiobutton(label="Exact Resampling (LANCZOS)", variable=self.resampling,
+                                       value='exact', command=self.on_resampling_change)
+        self.view_menu.add_radiobutton(label="Fast Resampling", variable=self.resampling,
+                                       value='fast', command=self.on_resampling_change)
+        self.view_menu.add_separator()
+        self.view_menu.add_command(label="Cache Statistics", command=self.show_cache_stats)
+        self.view_menu.add_command(label="Resource Usage", command=self.show_resource_usage)
+        self.view_menu.add_checkbutton(label="Performance Overlay", variable=self.show_perf_overlay,
+                                       command=self.on_perf_overlay_change)
+        self.view_menu.add_checkbutton(label="Record Timings", variable=self.record_timings,
+                                       command=self.on_record_timings_change)
+        self.view_menu.add_command(label="Export Timings...", command=self.export_timings)
+        self.view_menu.add_command(label="Export Chrome Trace...",
+                                   command=lambda: self.export_timings(chrome_trace=True))
 
     def start_reading(self, force_reload=False, custom_width=None):
         """Commence la lecture des images du dossier sélectionné en mode comics"""
@@ -341,20 +735,19 @@ class MangaReader:
             self.update_status("No images to display")
             return
             
-        # Si on a déjà chargé les images et qu'on ne force pas le rechargement, on ne fait rien
-        if hasattr(self, 'comics_frame') and not force_reload:
+        # Si on a déjà chargé ce chapitre et qu'on ne force pas le rechargement, on ne fait rien
+        if self.engine.slots and self.reading_images == self.images and not force_reload:
             return
             
         # Nettoyer l'affichage précédent
         if self.image_label:
             self.image_label.destroy()
+            self.image_label = None
+        self.engine.animations.stop('single')
             
         # Arrêter une vidéo en cours si nécessaire
-        if self.is_video_playing and self.video_player:
-            self.video_player.stop()
-            self.is_video_playing = False
+        self._stop_video()
         
-        print(f"Loading {len(self.images)} images in manhwa mode...")
         self.update_status(f"Loading {len(self.images)} images...")
         
         # Calculer la largeur disponible
@@ -365,61 +758,170 @@ class MangaReader:
             if available_width <= 0:
                 available_width = 800
                 
-        # Créer ou réutiliser le frame pour les images
-        if hasattr(self, 'comics_frame') and force_reload:
-            # Déjà créé, on réutilise
-            pass
-        else:
-            # Créer un nouveau frame
-            self.comics_frame = tk.Frame(self.canvas, bg='#1e1e1e', bd=0, highlightthickness=0)
-            self.canvas.create_window((0, 0), window=self.comics_frame, anchor='nw')
-            
-        # Charger et afficher toutes les images verticalement
-        for index, img_path in enumerate(self.images):
-            try:
-                if img_path.lower().endswith('.webm'):
-                    # Pour les vidéos, afficher juste un message indiquant qu'il s'agit d'une vidéo
-                    video_label = tk.Label(self.comics_frame, text=f"Video: {os.path.basename(img_path)}\nClick to play", 
-                                               bg='#1e1e1e', fg='white', font=('Arial', 12), pady=5)
-                    video_label.pack(fill=tk.X, padx=0, pady=0)
-                    video_label.bind("<Button-1>", lambda e, path=img_path: self.display_image(path))
-                else:
-                    # Charger et afficher l'image
-                    img = Image.open(img_path)
-                    
-                    # Redimensionner l'image en préservant le ratio
-                    ratio = available_width / img.width
-                    display_height = int(img.height * ratio)
-                    
-                    # Redimensionner l'image
-                    resized_img = img.resize((available_width, display_height), Image.LANCZOS)
-                    photo = ImageTk.PhotoImage(resized_img)
-                    
-                    # Stocker la référence à l'image (sinon elle sera collectée par le garbage collector)
-                    setattr(self, f"photo_{index}", photo)
-                    
-                    # Créer un label pour afficher l'image sans aucun padding
-                    img_label = tk.Label(self.comics_frame, image=photo, bg='#1e1e1e', bd=0, highlightthickness=0)
-                    img_label.pack(pady=0, padx=0, ipady=0, ipadx=0)
-                    
-                    print(f"Image loaded: {os.path.basename(img_path)}")
-            except Exception as e:
-                print(f"Error loading {img_path}: {e}")
-                # Afficher un message d'erreur à la place de l'image
-                error_label = tk.Label(self.comics_frame, text=f"Loading error: {os.path.basename(img_path)}", 
-                                           bg='#1e1e1e', fg='red', pady=5)
-                error_label.pack(fill=tk.X, pady=0, padx=0)
+        self._clear_chapter_view()
+        self.reading_images = list(self.images)
+        
+        # Réserver la place de chaque page : seules les en-têtes sont lues ici,
+        # le décodage des pixels est fait à la demande par _update_visible_pages
+        total_height = self.engine.open_chapter(self.images, available_width, page_container(self.images[0]))
+        self._next_chapter_request = None
+        self._last_chapter = None
+        self._redraw_chapter()
         
         # Mettre à jour la région de défilement du canvas
-        self.comics_frame.update_idletasks()
-        self.canvas.configure(scrollregion=self.canvas.bbox('all'))
+        self.canvas.configure(scrollregion=(0, 0, available_width, total_height))
         
         # Revenir au début du canvas
         self.canvas.yview_moveto(0)
+        self._schedule_visible_update()
         
-        print("Manhwa mode initialized - use mouse wheel or scrollbar to navigate")
         self.update_status(f"Reading {len(self.images)} images - Zoom: {self.zoom_level:.2f}x")
 
+    def _redraw_chapter(self):
+        """Redessine les emplacements et les pages déjà décodées du chapitre"""
+        self.canvas.delete('chapter')
+        for slot in self.engine.slots:
+            self._draw_placeholder(slot, self.engine.width)
+            for tile in slot.tiles:
+                if tile.photo is not None:
+                    tile.item = self.canvas.create_image(0, tile.top, image=tile.photo, anchor='nw',
+                                                         tags=('chapter',))
+
+    def _draw_placeholder(self, slot, width):
+        """Dessine l'emplacement d'une page avant son décodage"""
+        name = os.path.basename(slot.path)
+        if slot.kind == 'video':
+            # Pour les vidéos, afficher juste un message indiquant qu'il s'agit d'une vidéo
+            self.canvas.create_text(width // 2, slot.top + slot.height // 2, text=f"Video: {name}\nClick to play",
+                                    fill='white', font=('Arial', 12), justify=tk.CENTER, tags=('chapter', slot.tag))
+            self.canvas.tag_bind(slot.tag, "<Button-1>", lambda e, path=slot.path: self.display_image(path))
+        elif slot.kind == 'error':
+            # Afficher un message d'erreur à la place de l'image
+            self.canvas.create_text(width // 2, slot.top + slot.height // 2, text=f"Loading error: {name}",
+                                    fill='red', tags=('chapter',))
+        else:
+            self.canvas.create_rectangle(0, slot.top, width, slot.bottom, fill='#252525', outline='',
+                                         tags=('chapter',))
+
+    def _clear_chapter_view(self):
+        """Supprime toutes les pages du chapitre affiché et libère leurs images"""
+        self.canvas.delete('chapter')
+        if self._zoom_refine_after is not None:
+            self.root.after_cancel(self._zoom_refine_after)
+            self._zoom_refine_after = None
+        self.engine.close_chapter()
+        self.reading_images = []
+
+    def _schedule_visible_update(self):
+        """Regroupe les événements de défilement en une seule mise à jour"""
+        if not self._visible_update_pending:
+            self._visible_update_pending = True
+            self.root.after_idle(self._update_visible_pages)
+
+    def _update_visible_pages(self):
+        """Décode les pages proches du viewport et libère celles qui en sont loin"""
+        self._visible_update_pending = False
+        if not self.engine.slots:
+            return
+        view_top = self.canvas.canvasy(0)
+        view_height = self.canvas.winfo_height()
+        self.engine.update_viewport(view_top, view_height)
+        self._schedule_decode_poll()
+        if (self.continuous_reading.get() and self.library is not None
+                and view_top + view_height * (1 + self.chapter_prefetch_margin) >= self.engine.total_height):
+            self._prefetch_next_chapter()
+
+    def _prefetch_next_chapter(self):
+        """Cherche le chapitre suivant et lit ses en-têtes dans un thread"""
+        chapter = self.engine.chapters[-1][0]
+        if chapter is None or self._next_chapter_request is not None or chapter == self._last_chapter:
+            return
+        library = self.library
+        manifest_dir = self.engine.manifest_dir
+        results = queue.Queue()
+
+        def load():
+            try:
+                path, pages = library.next_chapter(chapter)
+                results.put((path, load_chapter_layout(pages, manifest_dir) if pages else None, None))
+            except Exception as e:
+                results.put((None, None, e))
+            finally:
+                # Les archives de ce thread ne serviront plus
+                close_thread_archives()
+
+        self._next_chapter_request = chapter
+        threading.Thread(target=load, name='next-chapter', daemon=True).start()
+        self.root.after(50, self._poll_next_chapter, chapter, results)
+
+    def _poll_next_chapter(self, chapter, results):
+        try:
+            path, layout, error = results.get_nowait()
+        except queue.Empty:
+            self.root.after(50, self._poll_next_chapter, chapter, results)
+            return
+        # Un autre chapitre a pu être ouvert entre-temps
+        if self._next_chapter_request != chapter:
+            return
+        self._next_chapter_request = None
+        if not self.engine.chapters or self.engine.chapters[-1][0] != chapter:
+            return
+        if error is not None or layout is None:
+            if error is not None:
+                print(f"Error loading next chapter: {error}")
+            self._last_chapter = chapter
+            return
+        
+        # Ajouter le chapitre à la suite, puis oublier ceux qui sont loin derrière
+        view_top = self.canvas.canvasy(0)
+        self.engine.append_chapter(layout, path)
+        removed = self.engine.evict_chapters(view_top, self.chapters_kept_behind)
+        total_height = self.engine.total_height
+        self._redraw_chapter()
+        self.canvas.configure(scrollregion=(0, 0, self.engine.width, total_height))
+        if removed:
+            self.canvas.yview_moveto((view_top - removed) / max(total_height, 1))
+        self._schedule_visible_update()
+        self.update_status(f"Next chapter ready: {os.path.basename(path)}")
+
+    # Vue du moteur de lecture (reader_engine.ReaderEngine)
+
+    def create_page_image(self, image):
+        from PIL import ImageTk
+        return ImageTk.PhotoImage(image)
+
+    def page_image_pixels(self, photo):
+        from PIL import ImageTk
+        return ImageTk.getimage(photo)
+
+    def show_tile(self, tile):
+        """Affiche le rendu final d'une tuile, à la place de son éventuel aperçu"""
+        if tile.item is not None:
+            # L'item existant est réutilisé (images successives d'une animation, aperçu de zoom)
+            self.canvas.coords(tile.item, 0, tile.top)
+            self.canvas.itemconfigure(tile.item, image=tile.photo)
+        else:
+            tile.item = self.canvas.create_image(0, tile.top, image=tile.photo, anchor='nw', tags=('chapter',))
+
+    def hide_tile(self, tile):
+        if tile.item is not None:
+            self.canvas.delete(tile.item)
+            tile.item = None
+
+    def page_failed(self, slot):
+        self._draw_placeholder(slot, self.engine.width)
+
+    def schedule_tick(self, delay):
+        """Minuteur unique des animations : un nouvel appel remplace le précédent"""
+        if self._animation_after is not None:
+            self.root.after_cancel(self._animation_after)
+        self._animation_after = self.root.after(delay, self._on_animation_tick)
+
+    def _on_animation_tick(self):
+        self._animation_after = None
+        self.engine.tick_animations()
+        self._schedule_decode_poll()
+
     def prev_image(self, event=None):
         """Navigate to the previous image"""
         if self.current_image_index > 0:
@@ -435,19 +937,127 @@ class MangaReader:
     def populate_tree(self, directory):
         """Populate the tree view with directory contents"""
         self.tree.delete(*self.tree.get_children())
-        for item in os.listdir(directory):
-            full_path = os.path.join(directory, item)
-            if os.path.isdir(full_path):
-                self.tree.insert('', 'end', text=item, values=('directory', full_path))
-            elif item.lower().endswith(tuple(self.supported_extensions)):
-                self.images.append(full_path)
-                self.tree.insert('', 'end', text=item, values=('image', full_path))
+        entry = self.library.ensure_folder(directory)
+        for name in entry.dirs:
+            self.tree.insert('', 'end', text=name, values=('directory', os.path.join(directory, name)))
+        for name in entry.archives:
+            self.tree.insert('', 'end', text=name, values=('archive', os.path.join(directory, name)))
+        for name in entry.media:
+            self.tree.insert('', 'end', text=name, values=('image', os.path.join(directory, name)))
+        self.images = self.library.media_paths(directory)
 
     def open_directory(self):
         directory = filedialog.askdirectory()
         if directory:
-            self.populate_tree(directory)
-            self.update_status(f"Directory opened: {os.path.basename(directory)}")
+            self.open_library(directory)
+
+    def open_library(self, directory):
+        """Ouvre une bibliothèque à partir de son index enregistré, puis le revalide en arrière-plan"""
+        self.library = LibraryIndex(directory, self.supported_extensions)
+        self.title_index = None
+        self._searching = False
+        self.search_var.set('')
+        warm = self.library.load()
+        self.populate_tree(self.library.root)
+        self._start_library_refresh(warm)
+        state = "cached index" if warm else "indexing..."
+        self.update_status(f"Directory opened: {os.path.basename(self.library.root)} ({state})")
+
+    def _start_library_refresh(self, warm=False):
+        """Revalide l'index de la bibliothèque dans un thread, hors de la boucle Tk.
+
+        Avec un index enregistré (warm), la recherche est d'abord construite sur
+        cet index, sans attendre la revalidation, puis remplacée à la fin.
+        """
+        library = self.library
+        results = queue.Queue()
+        # Copie : l'interface peut indexer des dossiers pendant la construction
+        cached_folders = dict(library.folders) if warm else None
+
+        def refresh():
+            try:
+                if cached_folders:
+                    results.put((None, TitleIndex.from_folders(library.root, cached_folders), 0, None))
+                folders, rescanned = library.refresh()
+                library.save(folders)
+                titles = TitleIndex.from_folders(library.root, folders)
+                results.put((folders, titles, rescanned, None))
+            except Exception as e:
+                results.put((None, None, 0, e))
+
+        threading.Thread(target=refresh, name='library-index', daemon=True).start()
+        self.root.after(100, self._poll_library_refresh, library, results)
+
+    def _poll_library_refresh(self, library, results):
+        try:
+            folders, titles, rescanned, error = results.get_nowait()
+        except queue.Empty:
+            self.root.after(100, self._poll_library_refresh, library, results)
+            return
+        # Une autre bibliothèque a pu être ouverte entre-temps
+        if library is not self.library:
+            return
+        if error is not None:
+            print(f"Error indexing library: {error}")
+            self.update_status(f"Error indexing library: {error}")
+            return
+        if folders is None:
+            # Recherche sur l'index enregistré, en attendant la revalidation
+            self.title_index = titles
+            if self.search_var.get().strip():
+                self._run_search()
+            self.root.after(100, self._poll_library_refresh, library, results)
+            return
+        library.folders = folders
+        self.title_index = titles
+        self.update_status(f"Library indexed: {len(folders)} folders, {rescanned} rescanned")
+        # Une recherche saisie pendant l'indexation est lancée maintenant
+        if self.search_var.get().strip():
+            self._run_search()
+
+    def on_search_change(self, *args):
+        """Relance la recherche une fois la frappe interrompue"""
+        if self._search_after is not None:
+            self.root.after_cancel(self._search_after)
+        self._search_after = self.root.after(self.search_delay, self._run_search)
+
+    def _run_search(self):
+        """Remplace l'arbre par les dossiers et archives qui correspondent à la recherche"""
+        self._search_after = None
+        query = self.search_var.get().strip()
+        if not query:
+            # Retour à l'arborescence de la bibliothèque
+            if self._searching and self.library is not None:
+                self._searching = False
+                self.search_results = []
+                self.populate_tree(self.library.root)
+            return
+        if self.title_index is None:
+            if self.library is not None:
+                self.update_status("Search will be available once the library is indexed...")
+            return
+        started = time.perf_counter()
+        self.search_results = self.title_index.search(query)
+        elapsed = (time.perf_counter() - started) * 1000
+        self._searching = True
+        self.tree.delete(*self.tree.get_children())
+        self._search_shown = 0
+        self._show_more_results()
+        self.update_status(f"{len(self.search_results)} results for '{query}' ({elapsed:.1f} ms)")
+
+    def _show_more_results(self):
+        """Insère le lot suivant de résultats à la fin de l'arbre"""
+        end = min(self._search_shown + self.search_batch, len(self.search_results))
+        for relative_path, kind, path in self.search_results[self._search_shown:end]:
+            self.tree.insert('', 'end', text=relative_path, values=(kind, path))
+        self._search_shown = end
+
+    def on_tree_yview(self, first, last):
+        """Synchronise la scrollbar et complète les résultats de recherche quand on approche de la fin"""
+        self.tree_scrollbar.set(first, last)
+        if self._searching and self._search_shown < len(self.search_results) and float(last) > 0.9:
+            # Après l'insertion, Tk rappelle cette méthode : les lots suivent tant que la fin est visible
+            self.root.after_idle(self._show_more_results)
 
     def on_tree_select(self, event):
         item = self.tree.focus()
@@ -466,63 +1076,62 @@ class MangaReader:
                 try:
                     # Effacer les enfants existants
                     self.tree.delete(*self.tree.get_children(item))
-                    # Ajouter les nouveaux éléments
-                    has_media_files = False
-                    for file_item in os.listdir(dir_path):
-                        full_path = os.path.join(dir_path, file_item)
-                        if os.path.isdir(full_path):
-                            self.tree.insert(item, 'end', text=file_item, values=('directory', full_path))
-                        elif file_item.lower().endswith(tuple(self.supported_extensions)):
-                            has_media_files = True
-                            self.tree.insert(item, 'end', text=file_item, values=('image', full_path))
+                    # Ajouter les nouveaux éléments depuis l'index (aucun accès disque s'il est à jour)
+                    entry = self.library.ensure_folder(dir_path)
+                    for name in entry.dirs:
+                        self.tree.insert(item, 'end', text=name, values=('directory', os.path.join(dir_path, name)))
+                    for name in entry.archives:
+                        self.tree.insert(item, 'end', text=name, values=('archive', os.path.join(dir_path, name)))
+                    for name in entry.media:
+                        self.tree.insert(item, 'end', text=name, values=('image', os.path.join(dir_path, name)))
                     
                     # Vérifier s'il y a des images/vidéos dans ce dossier
                     media_count = self._gather_directory_images(item)
-                    
-                    # Mettre à jour l'étiquette d'information
-                    if media_count > 0:
-                        # Déballer le bouton et afficher les informations
-                        self.info_label.config(text=f"{media_count} media files")
-                        # Retirer le bouton s'il est déjà affiché
-                        self.read_button.pack_forget()
-                        # Afficher le bouton
-                        self.read_button.pack(side=tk.LEFT, padx=5, pady=5)
-                        print(f"Read button displayed - {media_count} media files")
-                        self.update_status(f"{media_count} media files found in {os.path.basename(dir_path)}")
-                    else:
-                        self.info_label.config(text="No media files")
-                        self.read_button.pack_forget()
-                        print("Read button hidden - no media files")
-                        self.update_status("No media files found")
-                        
+                    self._show_media_count(media_count, dir_path)
                 except Exception as e:
                     print(f"Error opening directory: {e}")
                     self.info_label.config(text=f"Error: {str(e)}")
                     self.update_status(f"Error: {str(e)}")
+            elif item_values[0] == 'archive':
+                # Une archive est un chapitre : ses pages sont lues sans extraction
+                archive_path = item_values[1]
+                try:
+                    self.tree.delete(*self.tree.get_children(item))
+                    self.images = self.library.archive_pages(archive_path)
+                    for path in self.images:
+                        self.tree.insert(item, 'end', text=os.path.basename(split_page_path(path)[1]),
+                                         values=('image', path))
+                    self._show_media_count(len(self.images), archive_path)
+                except Exception as e:
+                    print(f"Error opening archive: {e}")
+                    self.info_label.config(text=f"Error: {str(e)}")
+                    self.update_status(f"Error: {str(e)}")
+
+    def _show_media_count(self, media_count, path):
+        """Met à jour l'étiquette d'information et le bouton de lecture"""
+        if media_count > 0:
+            # Déballer le bouton et afficher les informations
+            self.info_label.config(text=f"{media_count} media files")
+            # Retirer le bouton s'il est déjà affiché
+            self.read_button.pack_forget()
+            # Afficher le bouton
+            self.read_button.pack(side=tk.LEFT, padx=5, pady=5)
+            self.update_status(f"{media_count} media files found in {os.path.basename(path)}")
+        else:
+            self.info_label.config(text="No media files")
+            self.read_button.pack_forget()
+            self.update_status("No media files found")
 
     def _gather_directory_images(self, item):
-        """Collecte toutes les images/vidéos d'un dossier"""
+        """Collecte toutes les images/vidéos d'un dossier, en ordre naturel, depuis l'index"""
         self.images = []
         if not item:
             return 0
             
         try:
             dir_path = self.tree.item(item, 'values')[1]  # Le chemin est à l'index 1
-            print(f"Searching for media in: {dir_path}")
-            
-            if not os.path.exists(dir_path):
-                print(f"Path does not exist: {dir_path}")
-                return 0
-                
-            # Collecter tous les fichiers média du répertoire
-            for file in os.listdir(dir_path):
-                full_path = os.path.join(dir_path, file)
-                if os.path.isfile(full_path) and file.lower().endswith(tuple(self.supported_extensions)):
-                    self.images.append(full_path)
-                    print(f"Media found: {file}")
-            
-            # Trier les images numériquement si possible
-            self.images.sort(key=lambda x: self._natural_sort_key(os.path.basename(x)))
+            self.library.ensure_folder(dir_path)
+            self.images = self.library.media_paths(dir_path)
             
             # Retourner le nombre d'images trouvées
             return len(self.images)
@@ -530,11 +1139,6 @@ class MangaReader:
             print(f"Error reading directory: {e}")
             return 0
 
-    def _natural_sort_key(self, s):
-        """Fonction pour trier naturellement les noms de fichiers (01.jpg vient avant 10.jpg)"""
-        import re
-        return [int(text) if text.isdigit() else text.lower() for text in re.split('([0-9]+)', s)]
-
     def configure_styles(self):
         style = ttk.Style()
         style.theme_use('clam')
@@ -548,6 +1152,7 @@ class MangaReader:
         style.configure('.', background=bg_color, foreground=fg_color)
         style.configure('Treeview', background=bg_color, foreground=fg_color, fieldbackground=bg_color)
         style.configure('Treeview.Heading', background=accent_color, foreground=fg_color)
+        style.configure('TEntry', fieldbackground='#2d2d2d', foreground=fg_color, insertcolor=fg_color)
         style.configure('TButton', background=bg_color, foreground=fg_color)
         style.map('TButton', background=[('active', accent_color)])
         style.configure('TFrame', background=bg_color)
@@ -568,7 +1173,54 @@ class MangaReader:
         for menu in [self.file_menu, self.view_menu]:
             menu.configure(bg=bg_color, fg=fg_color, activebackground=accent_color, activeforeground=fg_color)
             
+
+def parse_args(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manhwa Reader")
+    parser.add_argument('--prerender', metavar='LIBRARY',
+                        help="pre-render every page of LIBRARY into the disk cache, without opening the window")
+    parser.add_argument('--widths',
+                        help="comma-separated reading widths to pre-render, in pixels (default: the widths the "
+                             f"reader already renders at, or {DEFAULT_READING_WIDTH} for a new cache)")
+    parser.add_argument('--quality', choices=RESAMPLING_MODES, default='fast', help="resampling quality")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per CPU core)")
+    parser.add_argument('--cache-size', type=int, metavar='MB',
+                        help="disk cache size, kept for later runs (default: the last size set, or 2048)")
+    parser.add_argument('--memory-ceiling', type=int, default=DEFAULT_MEMORY_CEILING_MB, metavar='MB',
+                        help="resident memory above which the reader shrinks its caches and prefetch "
+                             f"(default: {DEFAULT_MEMORY_CEILING_MB}, 0 disables)")
+    args = parser.parse_args(argv)
+    if args.widths is not None:
+        try:
+            args.widths = [int(width) for width in args.widths.split(',') if width.strip()]
+        except ValueError:
+            parser.error(f"invalid --widths: {args.widths}")
+        if not args.widths or min(args.widths) <= 0:
+            parser.error("--widths needs at least one positive width")
+    if args.cache_size is not None and args.cache_size <= 0:
+        parser.error("--cache-size must be positive")
+    if args.memory_ceiling < 0:
+        parser.error("--memory-ceiling cannot be negative")
+    return args
+
+
 if __name__ == "__main__":
+    imported = time.perf_counter()
+    args = parse_args()
+    if args.prerender:
+        # Mode sans interface : aucune fenêtre Tk n'est créée
+        from prerender import prerender_library, reading_widths
+
+        cache_path = os.path.join(default_cache_dir(), DISK_CACHE_FILE)
+        cache_bytes = args.cache_size * 1024 * 1024 if args.cache_size else None
+        # Par défaut, les largeurs auxquelles le lecteur a déjà rendu des pages
+        widths = args.widths or reading_widths(cache_path, args.quality) or [DEFAULT_READING_WIDTH]
+        progress = prerender_library(args.prerender, SUPPORTED_EXTENSIONS, widths, cache_path, args.quality,
+                                     args.workers, cache_bytes)
+        raise SystemExit(1 if progress.failed or progress.stopped else 0)
     root = tk.Tk()
-    app = MangaReader(root)
+    app = MangaReader(root, memory_ceiling_mb=args.memory_ceiling,
+                      disk_cache_bytes=args.cache_size * 1024 * 1024 if args.cache_size else None)
+    app.report_startup(_STARTED, imported)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,198 @@
+"""Pré-rendu d'une bibliothèque entière dans le cache disque, sans interface.
+
+Parcourt la bibliothèque avec les mêmes règles que le lecteur (extensions
+supportées, archives, ordre naturel) et rend chaque page aux largeurs
+demandées dans un pool de processus, un processus par cœur. Les entrées déjà
+à jour dans le cache sont sautées : une commande interrompue reprend là où
+elle s'était arrêtée quand on la relance. Le rendu s'arrête avant que le
+cache n'atteigne son plafond, pour ne pas évincer ses propres entrées.
+
+Les clés écrites sont exactement celles que demande le lecteur : chaque
+largeur est ramenée à sa tranche de rendu (voir reader_engine.bucket_width),
+puis la page entière (et sa miniature d'aperçu) est rendue pour une page
+normale, une entrée par tuile pour une page haute (voir page_tiles).
+"""
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from library import LibraryIndex, natural_sort_key
+from reader_engine import (PIXEL_KINDS, bucket_width, get_disk_cache, is_page_cached, page_tiles, read_page_header,
+                           render_page)
+
+PROGRESS_INTERVAL = 0.5  # s entre deux rafraîchissements de la progression
+CACHE_CHECK_INTERVAL = 5.0  # s entre deux mesures de la taille du cache
+CACHE_FULL_RATIO = 0.85  # Fraction du plafond à laquelle le rendu s'arrête (l'éviction commence à 100 %)
+READING_WIDTH_SHARE = 0.1  # Part minimale des pages en cache pour qu'une largeur compte comme largeur de lecture
+
+
+def reading_widths(cache_path, quality):
+    """Largeurs de rendu auxquelles le lecteur a affiché des pages, d'après le cache disque.
+
+    Les largeurs rares (zooms ponctuels) sont ignorées ; liste vide pour un cache vide.
+    """
+    counts = get_disk_cache(cache_path).width_counts(quality)
+    total = sum(counts.values())
+    return sorted(width for width, count in counts.items() if count >= total * READING_WIDTH_SHARE)
+
+
+def library_pages(library):
+    """Pages de toute la bibliothèque, dossier par dossier en ordre naturel.
+
+    L'index est revalidé (seuls les dossiers modifiés sont relus) puis
+    enregistré, ce qui profite aussi à la prochaine ouverture dans le lecteur.
+    """
+    library.load()
+    folders, _ = library.refresh()
+    library.folders = folders
+    pages = []
+    for path in sorted(folders, key=natural_sort_key):
+        pages.extend(library.media_paths(path))
+        for name in folders[path].archives:
+            try:
+                pages.extend(library.archive_pages(os.path.join(path, name)))
+            except Exception as e:
+                # Archive illisible : les autres chapitres sont quand même rendus
+                print(f"Error reading {os.path.join(path, name)}: {e}", file=sys.stderr)
+    library.save()
+    return pages
+
+
+def prerender_page(path, widths, cache_path, quality):
+    """Rend une page à chaque largeur ; retourne (entrées rendues, entrées déjà à jour, octets RGB)"""
+    kind, size = read_page_header(path)
+    if kind not in PIXEL_KINDS:
+        return 0, 0, 0
+    rendered = skipped = nbytes = 0
+    for width in widths:
+        bands = page_tiles(max(1, int(size[1] * width / size[0])))
+        for tile in (range(len(bands)) if bands else (-1,)):
+            # Les tuiles voisines rendues au passage sont déjà en cache au tour suivant
+            if is_page_cached(path, width, cache_path, quality, tile):
+                skipped += 1
+                continue
+            _, data = render_page(path, width, cache_path, quality, tile)
+            rendered += 1
+            nbytes += len(data)
+    return rendered, skipped, nbytes
+
+
+class Progress:
+    """Compteurs de la commande et ligne de progression"""
+    def __init__(self, total, stream=sys.stdout):
+        self.total = total
+        self.stream = stream
+        self.interactive = stream.isatty()
+        self.done = 0
+        self.rendered_pages = 0
+        self.rendered = 0
+        self.skipped = 0
+        self.failed = 0
+        self.nbytes = 0
+        self.stopped = False  # Arrêté avant la fin, cache disque plein
+        self.started = time.perf_counter()
+        self._next_report = 0.0
+
+    def add(self, rendered, skipped, nbytes):
+        self.done += 1
+        self.rendered_pages += rendered > 0
+        self.rendered += rendered
+        self.skipped += skipped
+        self.nbytes += nbytes
+
+    def fail(self, path, error):
+        self.done += 1
+        self.failed += 1
+        self._clear_line()
+        print(f"Error rendering {path}: {error}", file=sys.stderr)
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def line(self):
+        elapsed = max(self.elapsed, 1e-6)
+        return (f"[{self.done}/{self.total}] {self.rendered_pages / elapsed:.1f} pages/s, "
+                f"{self.nbytes / (1024 * 1024):.1f} MB ({self.nbytes / (1024 * 1024) / elapsed:.1f} MB/s), "
+                f"{self.rendered} rendered, {self.skipped} up to date, {self.failed} failed")
+
+    def report(self, force=False):
+        now = time.perf_counter()
+        if not force and now < self._next_report:
+            return
+        self._next_report = now + (PROGRESS_INTERVAL if self.interactive else 10 * PROGRESS_INTERVAL)
+        print(self.line(), end='\r' if self.interactive else '\n', file=self.stream, flush=True)
+
+    def _clear_line(self):
+        if self.interactive:
+            print(' ' * len(self.line()), end='\r', file=self.stream)
+
+
+def _cache_full(cache):
+    return cache.total_bytes() >= cache.max_bytes * CACHE_FULL_RATIO
+
+
+def prerender_library(root, extensions, widths, cache_path, quality='fast', workers=None, cache_bytes=None):
+    """Pré-rend toutes les pages de la bibliothèque ; retourne les compteurs (Progress).
+
+    cache_bytes change le plafond du cache disque (voir DiskPageCache.set_max_bytes).
+    """
+    # Le lecteur ne rend qu'aux largeurs des tranches
+    widths = sorted({bucket_width(width) for width in widths})
+    cache = get_disk_cache(cache_path)
+    if cache_bytes:
+        cache.set_max_bytes(cache_bytes)
+    library = LibraryIndex(root, extensions)
+    print(f"Indexing {library.root}...")
+    pages = library_pages(library)
+    workers = workers or os.cpu_count() or 1
+    print(f"Pre-rendering {len(pages)} pages at {', '.join(map(str, widths))} px ({quality}) "
+          f"with {workers} processes into {cache_path} "
+          f"({cache.total_bytes() / 1048576:.0f} of {cache.max_bytes / 1048576:.0f} MB used)")
+    progress = Progress(len(pages))
+    next_cache_check = 0.0
+    window = 4 * workers  # Travaux soumis d'avance : la liste des pages n'est jamais copiée dans le pool
+    remaining = iter(pages)
+    in_flight = {}
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        while True:
+            for path in remaining:
+                in_flight[executor.submit(prerender_page, path, widths, cache_path, quality)] = path
+                if len(in_flight) >= window:
+                    break
+            if not in_flight:
+                break
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                path = in_flight.pop(future)
+                try:
+                    progress.add(*future.result())
+                except Exception as e:
+                    progress.fail(path, e)
+            progress.report()
+            if time.perf_counter() >= next_cache_check:
+                next_cache_check = time.perf_counter() + CACHE_CHECK_INTERVAL
+                if _cache_full(cache):
+                    # Au-delà du plafond, les workers évinceraient les pages déjà rendues
+                    progress.report(force=True)
+                    print(f"\nStopped: the disk cache is almost full ({cache.total_bytes() / 1048576:.0f} of "
+                          f"{cache.max_bytes / 1048576:.0f} MB). Run again with a larger --cache-size to continue.")
+                    progress.stopped = True
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    return progress
+    except KeyboardInterrupt:
+        progress.report(force=True)
+        print("\nInterrupted; run the same command again to resume.")
+        executor.shutdown(wait=False, cancel_futures=True)
+        return progress
+    executor.shutdown()
+    progress.report(force=True)
+    if progress.interactive:
+        print()
+    print(f"Done in {progress.elapsed:.1f} s: {progress.rendered_pages} pages rendered "
+          f"({progress.rendered_pages / max(progress.elapsed, 1e-6):.1f} pages/s, "
+          f"{progress.nbytes / (1024 * 1024):.1f} MB), {progress.skipped} entries already up to date, "
+          f"{progress.failed} failed")
+    return progress
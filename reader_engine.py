@@ -0,0 +1,1755 @@
+"""Moteur de décodage des pages du lecteur.
+
+Ce module ne dépend pas de Tkinter : il peut être importé par les
+processus d'un ProcessPoolExecutor sans charger l'interface graphique, et
+ReaderEngine peut piloter la lecture d'un chapitre sans fenêtre (voir
+benchmarks/run_benchmarks.py).
+
+Pillow et le pool de processus ne sont importés qu'à leur première
+utilisation, pour ne pas retarder l'ouverture de la fenêtre.
+"""
+import bisect
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import instrumentation
+import resources
+from archives import open_page, page_container, page_stat, split_page_path
+
+
+def default_cache_dir():
+    """Dossier de cache de l'application, selon les conventions du système"""
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'manga-reader')
+
+
+_disk_caches = {}  # Un DiskPageCache par fichier et par processus
+_disk_caches_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # Une connexion SQLite ne doit pas servir des deux côtés d'un fork : l'enfant ouvre les siennes
+    global _disk_caches, _disk_caches_lock
+    _disk_caches = {}
+    _disk_caches_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_disk_cache(cache_path):
+    """DiskPageCache d'un fichier de cache, partagé par les threads du processus"""
+    with _disk_caches_lock:
+        cache = _disk_caches.get(cache_path)
+        if cache is None:
+            cache = _disk_caches[cache_path] = DiskPageCache(cache_path)
+        return cache
+
+
+RESAMPLING_MODES = ('exact', 'fast')
+
+
+@contextmanager
+def open_image(path, header_only=False):
+    """Ouvre une page avec Pillow ; l'image et sa source sont fermées à la sortie.
+
+    Pillow ne ferme pas un flux qu'on lui passe (membre d'archive lu en
+    flux) : il est fermé ici. Les pages ouvertes sont comptées par
+    resources ; l'ouverture est mesurée (étape 'open') sauf pour une simple
+    lecture d'en-tête.
+    """
+    from PIL import Image
+
+    source = open_page(path, header_only)
+    resources.acquire('file')
+    try:
+        if header_only:
+            img = Image.open(source)
+        else:
+            with instrumentation.span('open', page=path):
+                img = Image.open(source)
+        with img:
+            yield img
+    finally:
+        if not isinstance(source, str):
+            source.close()
+        resources.release('file')
+
+TILE_HEIGHT = 1024  # Hauteur des tuiles, en pixels affichés
+TALL_PAGE_HEIGHT = 4 * TILE_HEIGHT  # Les pages plus hautes que ceci sont découpées en tuiles
+
+
+def page_tiles(page_height, tile_height=TILE_HEIGHT):
+    """Découpe une page en bandes [(haut, hauteur)] ; liste vide si elle n'est pas assez haute"""
+    if page_height <= TALL_PAGE_HEIGHT:
+        return []
+    return [(top, min(tile_height, page_height - top)) for top in range(0, page_height, tile_height)]
+
+
+# Largeurs de rendu : une largeur d'affichage est rendue à la plus petite tranche qui la contient,
+# puis réduite à l'affichage, pour que redimensionnements et plein écran retombent sur le cache
+WIDTH_BUCKETS = (480, 640, 800, 960, 1120, 1280, 1440, 1600, 1920, 2240, 2560, 3200, 3840)
+WIDE_BUCKET_STEP = 640  # Au-delà de la dernière tranche
+
+
+def bucket_width(width):
+    """Largeur de rendu (clé du cache disque) utilisée pour une largeur d'affichage"""
+    index = bisect.bisect_left(WIDTH_BUCKETS, width)
+    if index < len(WIDTH_BUCKETS):
+        return WIDTH_BUCKETS[index]
+    return -(-width // WIDE_BUCKET_STEP) * WIDE_BUCKET_STEP
+
+
+def scaled_tiles(page_height, render_height):
+    """Tuiles d'une page rendue à render_height, ramenées à sa hauteur affichée page_height"""
+    bands = page_tiles(render_height)
+    if not bands or page_height == render_height:
+        return bands
+    edges = [round(top * page_height / render_height) for top, _ in bands] + [page_height]
+    return [(edges[index], edges[index + 1] - edges[index]) for index in range(len(bands))]
+
+
+def render_page(path, width, cache_path=None, quality='fast', tile=-1):
+    """Lit, décode et redimensionne une page à la largeur demandée.
+
+    Retourne un tuple ((largeur, hauteur), octets RGB) pour que le résultat
+    puisse traverser une frontière de processus. Si cache_path est fourni,
+    le rendu est d'abord cherché dans le cache disque, puis y est enregistré.
+    quality vaut 'exact' (décodage complet puis LANCZOS) ou 'fast' (décodage
+    à résolution réduite quand le format le permet). Si tile est positif,
+    seule la tuile correspondante de la page (voir page_tiles) est rendue.
+    """
+    cache = None
+    if cache_path:
+        cache = get_disk_cache(cache_path)
+        stat = page_stat(path)
+        with instrumentation.span('disk_cache_read', page=path, tile=tile):
+            cached = cache.get(path, width, quality, tile, stat)
+        instrumentation.event('disk_cache_hit' if cached is not None else 'disk_cache_miss', page=path)
+        if cached is not None:
+            return cached
+    if tile < 0:
+        size, data = _render_rgb(path, width, quality)
+        if cache is not None:
+            with instrumentation.span('disk_cache_write', page=path, tile=tile):
+                cache.put(path, width, quality, tile, stat, size, data)
+                # Miniature pour les aperçus des prochaines ouvertures, quel que soit le format
+                if not cache.contains(path, PREVIEW_WIDTH, 'preview', -1, stat):
+                    thumb = _make_thumbnail(size, data)
+                    cache.put(path, PREVIEW_WIDTH, 'preview', -1, stat, thumb.size, thumb.tobytes())
+        return size, data
+    # Les tuiles voisines décodées au passage sont aussi mises en cache
+    tiles = _render_tiles(path, width, quality, tile, extend=cache is not None)
+    if cache is not None:
+        with instrumentation.span('disk_cache_write', page=path, tile=tile):
+            for index, (size, data) in tiles.items():
+                cache.put(path, width, quality, index, stat, size, data)
+    return tiles[tile]
+
+
+def is_page_cached(path, width, cache_path, quality='fast', tile=-1):
+    """True si le rendu d'une page (ou d'une tuile) est à jour dans le cache disque"""
+    return get_disk_cache(cache_path).contains(path, width, quality, tile, page_stat(path))
+
+
+def render_scaled(path, width, height=None, render_width=None, cache_path=None, quality='fast', tile=-1):
+    """Rend une page (ou une tuile) à render_width puis la réduit à width x height pour l'affichage.
+
+    Le cache disque n'est consulté et rempli qu'à render_width (voir
+    bucket_width) : toutes les largeurs d'une même tranche partagent ses
+    entrées et ne paient qu'une réduction. Sans height, la hauteur suit les
+    proportions du rendu.
+    """
+    size, data = render_page(path, render_width or width, cache_path, quality, tile)
+    if height is None:
+        height = max(1, round(size[1] * width / size[0]))
+    if size == (width, height):
+        return size, data
+    from PIL import Image
+
+    with instrumentation.span('scale', page=path, tile=tile):
+        img = Image.frombytes('RGB', size, data)
+        img = img.resize((width, height), Image.LANCZOS if quality == 'exact' else Image.BILINEAR)
+    return img.size, img.tobytes()
+
+
+PREVIEW_WIDTH = 160  # Largeur des miniatures utilisées pour les aperçus
+
+
+def _make_thumbnail(size, data):
+    from PIL import Image
+
+    img = Image.frombytes('RGB', size, data)
+    return img.resize((PREVIEW_WIDTH, max(1, round(size[1] * PREVIEW_WIDTH / size[0]))), Image.BILINEAR)
+
+
+def render_preview(path, width, page_height, cache_path=None, quality='fast', tile=-1, render_width=None,
+                   band=None):
+    """Aperçu flou d'une page (ou d'une tuile), aux dimensions exactes de son rendu final.
+
+    L'aperçu vient de la miniature enregistrée dans le cache disque lors d'un
+    rendu précédent ou, pour un JPEG, d'un décodage réduit au 1/8 dans le
+    domaine DCT. band est la bande (haut, hauteur) de la tuile dans la page
+    affichée. Retourne ((largeur, hauteur), octets RGB), ou None quand aucun
+    aperçu n'est moins cher que le rendu complet (en particulier quand
+    celui-ci est déjà dans le cache disque à render_width).
+    """
+    from PIL import Image
+
+    thumb = None
+    cache = None
+    if cache_path:
+        cache = get_disk_cache(cache_path)
+        stat = page_stat(path)
+        if cache.contains(path, render_width or width, quality, tile, stat):
+            return None
+        cached = cache.get(path, PREVIEW_WIDTH, 'preview', -1, stat)
+        if cached is not None:
+            thumb = Image.frombytes('RGB', *cached)
+    if thumb is None:
+        with open_image(path) as img:
+            if img.format != 'JPEG':
+                return None
+            img.draft('RGB', (PREVIEW_WIDTH, max(1, img.height * PREVIEW_WIDTH // img.width)))
+            thumb = img.convert('RGB')
+        thumb = thumb.resize((PREVIEW_WIDTH, max(1, round(thumb.height * PREVIEW_WIDTH / thumb.width))),
+                             Image.BILINEAR)
+        if cache is not None:
+            cache.put(path, PREVIEW_WIDTH, 'preview', -1, stat, thumb.size, thumb.tobytes())
+    top, height = band or (0, page_height)
+    scale = thumb.height / page_height
+    preview = thumb.resize((width, height), Image.BILINEAR, box=(0, top * scale, thumb.width, (top + height) * scale))
+    return preview.size, preview.tobytes()
+
+
+def _render_rgb(path, width, quality):
+    resized_img = decode_and_resize(path, width, quality)
+    if resized_img.mode != 'RGB':
+        resized_img = resized_img.convert('RGB')
+    return resized_img.size, resized_img.tobytes()
+
+
+def _load_rows(img, top, bottom):
+    """Décode les lignes [top, bottom) d'une image, sans décoder le reste si possible.
+
+    Les images brutes (BMP non compressé...) sont lues directement à
+    l'emplacement de la bande ; les PNG non entrelacés sont décodés jusqu'à
+    bottom seulement. Les autres formats sont décodés entièrement puis recadrés.
+    """
+    width, height = img.size
+    if len(img.tile) == 1 and tuple(img.tile[0][1]) == (0, 0, width, height):
+        codec, _, offset, args = img.tile[0]
+        if codec == 'raw' and isinstance(args, tuple) and len(args) == 3 and args[1] > 0:
+            rawmode, stride, orientation = args
+            # Orientation négative : les lignes sont stockées de bas en haut
+            first_row = top if orientation > 0 else height - bottom
+            img.tile = [img.tile[0]._replace(extents=(0, 0, width, bottom - top),
+                                             offset=offset + first_row * stride)]
+            img._size = (width, bottom - top)
+            img.load()
+            return img
+        if codec == 'zip' and not img.info.get('interlace'):
+            img.tile = [img.tile[0]._replace(extents=(0, 0, width, bottom))]
+            img._size = (width, bottom)
+            img.load()
+            return img.crop((0, top, width, bottom)) if top else img
+    img.load()
+    return img.crop((0, top, width, bottom))
+
+
+def _render_tiles(path, width, quality, tile, extend=False):
+    """Rend une tuile d'une page haute ; retourne {index: ((largeur, hauteur), octets RGB)}.
+
+    Avec extend, quand le format oblige à décoder depuis le haut de l'image,
+    les tuiles décodées au passage sont rendues aussi (jusqu'au double de
+    l'index demandé pour les PNG, toute la page pour les formats sans accès
+    partiel) afin que le cache évite de décoder plusieurs fois les mêmes lignes.
+    """
+    from PIL import Image
+
+    with open_image(path) as img:
+        page_height = max(1, int(img.height * width / img.width))
+        bands = page_tiles(page_height) or [(0, page_height)]
+        tile = min(tile, len(bands) - 1)
+        codec = img.tile[0][0] if len(img.tile) == 1 else None
+        if codec == 'raw' or not extend:
+            first, last = tile, tile
+        elif codec == 'zip' and not img.info.get('interlace'):
+            first, last = 0, min(len(bands) - 1, 2 * tile + 1)
+        else:
+            first, last = 0, len(bands) - 1
+        reducing_gap = None
+        if quality == 'fast':
+            if img.format == 'JPEG':
+                img.draft('RGB', (width, page_height))
+            reducing_gap = 2.0
+        source_width, source_height = img.size
+        scale = source_height / page_height
+        band_top = bands[first][0]
+        band_bottom = bands[last][0] + bands[last][1]
+        # Quelques lignes de marge pour le support du filtre LANCZOS
+        margin = math.ceil(3 * scale) + 1
+        top = max(0, int(band_top * scale) - margin)
+        bottom = min(source_height, math.ceil(band_bottom * scale) + margin)
+        with instrumentation.span('decode', page=path, tile=tile):
+            band = _load_rows(img, top, bottom)
+            if band.mode not in ('RGB', 'L'):
+                band = band.convert('RGB')
+        # La boîte source garde l'alignement exact avec le rendu de la page entière
+        box = (0, band_top * scale - top, source_width, band_bottom * scale - top)
+        with instrumentation.span('resize', page=path, tile=tile):
+            resized_band = band.resize((width, band_bottom - band_top), Image.LANCZOS, box=box,
+                                       reducing_gap=reducing_gap)
+            if resized_band.mode != 'RGB':
+                resized_band = resized_band.convert('RGB')
+    tiles = {}
+    for index in range(first, last + 1):
+        tile_top, tile_height = bands[index]
+        tile_img = resized_band.crop((0, tile_top - band_top, width, tile_top - band_top + tile_height))
+        tiles[index] = (tile_img.size, tile_img.tobytes())
+    return tiles
+
+
+def decode_and_resize(path, width, quality='fast'):
+    """Décode une image et la redimensionne à la largeur demandée.
+
+    En mode 'fast', les JPEG sont décodés directement à une échelle réduite
+    dans le domaine DCT (Image.draft), puis Image.reduce ramène les autres
+    formats près de la taille cible avant le rééchantillonnage LANCZOS final.
+    """
+    from PIL import Image
+
+    with open_image(path) as img:
+        height = max(1, int(img.height * width / img.width))
+        reducing_gap = None
+        with instrumentation.span('decode', page=path):
+            if quality == 'fast':
+                if img.format == 'JPEG':
+                    img.draft('RGB', (width, height))
+                reducing_gap = 2.0
+            img.load()
+            # Les images en palette seraient redimensionnées au plus proche voisin
+            if img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+        with instrumentation.span('resize', page=path):
+            return img.resize((width, height), Image.LANCZOS, reducing_gap=reducing_gap)
+
+
+MIN_FRAME_DURATION = 20  # ms ; en dessous, les navigateurs affichent les images à 100 ms
+DEFAULT_FRAME_DURATION = 100  # ms
+
+
+def render_frames(path, width, first, count, quality='fast', max_bytes=None):
+    """Décode et redimensionne les images [first, first + count) d'une page animée.
+
+    Retourne (nombre d'images, [(durée en ms, (largeur, hauteur), octets RGB)]).
+    Les GIF ne se décodent que dans l'ordre : Pillow reprend depuis l'image
+    courante, d'où le décodage par lots d'images consécutives. Le fichier est
+    rouvert à chaque lot, et atteindre l'image first redécode les précédentes :
+    un lot coûte O(first), ce qui n'arrive qu'une fois par tour d'animation
+    ou après une éviction. Avec max_bytes, le lot est réduit pour tenir dans
+    ce budget (au moins une image).
+    """
+    from PIL import Image
+
+    with open_image(path) as img:
+        n_frames = getattr(img, 'n_frames', 1)
+        height = max(1, int(img.height * width / img.width))
+        if max_bytes is not None:
+            # Même coût que dans ImageCache.put
+            count = max(1, min(count, max_bytes // (width * height * 4)))
+        reducing_gap = 2.0 if quality == 'fast' else None
+        frames = []
+        for index in range(first, min(first + count, n_frames)):
+            with instrumentation.span('decode', page=path, frame=index):
+                img.seek(index)
+                duration = img.info.get('duration') or DEFAULT_FRAME_DURATION
+                if duration < MIN_FRAME_DURATION:
+                    duration = DEFAULT_FRAME_DURATION
+                frame = img.convert('RGB')
+            with instrumentation.span('resize', page=path, frame=index):
+                frame = frame.resize((width, height), Image.LANCZOS, reducing_gap=reducing_gap)
+            frames.append((duration, frame.size, frame.tobytes()))
+    return n_frames, frames
+
+
+VIDEO_EXTENSIONS = ('.webm',)
+
+# Types de pages dont les pixels sont décodés (les autres sont des emplacements fixes)
+PIXEL_KINDS = ('image', 'animation')
+
+
+def read_page_header(path):
+    """Retourne (type, dimensions) d'une page sans décoder ses pixels.
+
+    Le type vaut 'image', 'animation' (GIF ou WEBP de plusieurs images),
+    'video' ou 'error'.
+    """
+    if path.lower().endswith(VIDEO_EXTENSIONS):
+        return 'video', None
+    try:
+        with open_image(path, header_only=True) as img:
+            if img.format in ('GIF', 'WEBP') and getattr(img, 'is_animated', False):
+                return 'animation', img.size
+            return 'image', img.size
+    except Exception as e:
+        print(f"Error reading {path}: {e}")
+        return 'error', None
+
+
+class ChapterLayout:
+    """Index de mise en page d'un chapitre construit à partir des en-têtes des pages.
+
+    Pour une largeur donnée, offsets[i] est l'ordonnée du haut de la page i
+    (somme préfixe des hauteurs) et offsets[-1] la hauteur totale. Un zoom ou
+    un redimensionnement ne fait que recalculer ces sommes.
+    """
+    VIDEO_HEIGHT = 60
+    ERROR_HEIGHT = 30
+
+    def __init__(self, pages):
+        self.pages = list(pages)  # [(chemin, type, dimensions natives)]
+        self.width = None
+        self.offsets = [0]
+
+    def __len__(self):
+        return len(self.pages)
+
+    def extend(self, pages):
+        """Ajoute des pages à la fin (chapitre suivant) ; set_width doit être rappelé"""
+        self.pages.extend(pages)
+
+    def drop_front(self, count):
+        """Retire les count premières pages (chapitres déjà lus) ; set_width doit être rappelé"""
+        del self.pages[:count]
+
+    def set_width(self, width):
+        """Recalcule les hauteurs et les positions des pages pour une largeur"""
+        self.width = width
+        offsets = [0] * (len(self.pages) + 1)
+        top = 0
+        for index, (_, kind, size) in enumerate(self.pages):
+            if kind in PIXEL_KINDS:
+                top += max(1, int(size[1] * width / size[0]))
+            elif kind == 'video':
+                top += self.VIDEO_HEIGHT
+            else:
+                top += self.ERROR_HEIGHT
+            offsets[index + 1] = top
+        self.offsets = offsets
+        return top
+
+    @property
+    def total_height(self):
+        return self.offsets[-1]
+
+    def offset(self, index):
+        """Ordonnée du haut de la page, en O(1)"""
+        return self.offsets[index]
+
+    def height(self, index):
+        return self.offsets[index + 1] - self.offsets[index]
+
+    def scaled_height(self, index, width):
+        """Hauteur d'une page d'images à une autre largeur que celle de la mise en page"""
+        size = self.pages[index][2]
+        return max(1, int(size[1] * width / size[0]))
+
+    def page_at(self, y):
+        """Index de la page qui contient l'ordonnée y, en O(log n)"""
+        if not self.pages:
+            return -1
+        index = bisect.bisect_right(self.offsets, y) - 1
+        return min(max(index, 0), len(self.pages) - 1)
+
+    def visible_range(self, top, bottom):
+        """Indices (premier, dernier) des pages qui recoupent [top, bottom]"""
+        return self.page_at(top), self.page_at(bottom)
+
+
+MAX_CACHED_LAYOUTS = 32  # Chapitres dont les en-têtes restent en mémoire
+_layout_cache = OrderedDict()  # dossier ou archive -> (mtime, chemins, pages), du moins au plus récent
+_layout_cache_lock = threading.Lock()  # load_chapter_layout peut être appelé depuis plusieurs threads
+
+MANIFEST_VERSION = 1
+
+
+def manifest_path(manifest_dir, container):
+    """Fichier manifeste d'un chapitre (dossier ou archive) dans le dossier des manifestes"""
+    digest = hashlib.sha1(container.encode('utf-8', 'surrogatepass')).hexdigest()[:16]
+    return os.path.join(manifest_dir, f"{digest}.json")
+
+
+def _page_signature(path):
+    """[mtime, taille] d'un fichier de page ; None pour une page d'archive, couverte par la date de l'archive"""
+    if split_page_path(path)[0] is not None:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def read_manifest(manifest_dir, container):
+    """Manifeste enregistré d'un chapitre, ou None s'il est absent ou illisible"""
+    try:
+        with open(manifest_path(manifest_dir, container), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if (data.get('version') != MANIFEST_VERSION or data.get('container') != container
+                or 'mtime_ns' not in data or not isinstance(data.get('pages'), list)):
+            return None
+        return data
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def write_manifest(manifest_dir, container, mtime_ns, pages, signatures):
+    """Enregistre le manifeste d'un chapitre de façon atomique (fichier temporaire puis renommage).
+
+    Le manifeste est un cache : une erreur d'écriture est signalée puis ignorée.
+    """
+    path = manifest_path(manifest_dir, container)
+    data = {
+        'version': MANIFEST_VERSION,
+        'container': container,
+        'mtime_ns': mtime_ns,
+        'pages': [[page, kind, size, signature] for (page, kind, size), signature in zip(pages, signatures)],
+    }
+    # Deux threads peuvent écrire le même manifeste (chapitre ouvert pendant son préchargement)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(manifest_dir, exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Error writing chapter manifest {path}: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def _manifest_pages(manifest_dir, container, mtime_ns, paths):
+    """Pages du chapitre tirées de son manifeste, qui est reconstruit s'il n'est plus à jour.
+
+    Un manifeste est à jour quand la date du dossier (ou de l'archive) et la
+    liste des pages n'ont pas changé : l'ouverture se résume alors à la
+    lecture d'un petit fichier. Sinon, seules les pages nouvelles, modifiées
+    (signature différente) ou illisibles la dernière fois voient leur en-tête
+    relue, et le manifeste est réécrit.
+    """
+    manifest = read_manifest(manifest_dir, container)
+    if manifest is not None:
+        entries = manifest['pages']
+        if (manifest['mtime_ns'] == mtime_ns and len(entries) == len(paths)
+                and all(entry[0] == path and entry[1] != 'error' for entry, path in zip(entries, paths))):
+            return [(path, kind, tuple(size) if size else size) for path, kind, size, _ in entries]
+        known = {path: (kind, size, signature) for path, kind, size, signature in entries}
+    else:
+        known = {}
+    pages, signatures = [], []
+    for path in paths:
+        signature = _page_signature(path)
+        entry = known.get(path)
+        if entry is not None and signature is not None and entry[2] == signature and entry[0] != 'error':
+            pages.append((path, entry[0], tuple(entry[1]) if entry[1] else entry[1]))
+        else:
+            pages.append((path,) + read_page_header(path))
+        signatures.append(signature)
+    write_manifest(manifest_dir, container, mtime_ns, pages, signatures)
+    return pages
+
+
+def load_chapter_layout(paths, manifest_dir=None):
+    """Construit l'index de mise en page d'un chapitre, mis en cache par dossier.
+
+    Le cache est invalidé quand la liste des pages ou la date de modification
+    du dossier (ou de l'archive) changent. Avec manifest_dir, les en-têtes
+    lues sont aussi gardées d'une session à l'autre dans un manifeste par
+    chapitre (voir _manifest_pages).
+    """
+    paths = tuple(paths)
+    directory = page_container(paths[0]) if paths else ''
+    try:
+        mtime_ns = os.stat(directory).st_mtime_ns
+    except OSError:
+        mtime_ns = None
+    with _layout_cache_lock:
+        cached = _layout_cache.get(directory)
+        if cached is not None and mtime_ns is not None and cached[0] == mtime_ns and cached[1] == paths:
+            _layout_cache.move_to_end(directory)
+            return ChapterLayout(cached[2])
+    if manifest_dir is not None and mtime_ns is not None:
+        pages = _manifest_pages(manifest_dir, directory, mtime_ns, paths)
+    else:
+        pages = [(path,) + read_page_header(path) for path in paths]
+    if mtime_ns is not None:
+        with _layout_cache_lock:
+            _layout_cache[directory] = (mtime_ns, paths, pages)
+            _layout_cache.move_to_end(directory)
+            while len(_layout_cache) > MAX_CACHED_LAYOUTS:
+                _layout_cache.popitem(last=False)
+    return ChapterLayout(pages)
+
+
+class PageSlot:
+    """Emplacement réservé à une page dans la vue virtualisée du chapitre"""
+    def __init__(self, index, path, kind='image'):
+        self.index = index
+        self.path = path
+        self.kind = kind  # 'image', 'animation', 'video' ou 'error'
+        self.top = 0
+        self.height = 0
+        self.tag = f"page_{index}"
+        self.tiles = []  # PageTile affichant la page
+
+    @property
+    def bottom(self):
+        return self.top + self.height
+
+
+class PageTile:
+    """Bande d'une page, décodée et affichée d'un seul tenant.
+
+    Une page normale a une seule tuile d'index -1 qui la couvre entièrement ;
+    les pages très hautes sont découpées en tuiles chargées indépendamment.
+    """
+    def __init__(self, slot, index, offset, height):
+        self.slot = slot
+        self.index = index
+        self.offset = offset  # Position dans la page
+        self.height = height
+        self.photo = None  # Image affichable (PhotoImage pour Tk), présente uniquement quand la tuile est décodée
+        self.sharp = False  # True si photo est le rendu final à la largeur de lecture
+        self.source = None  # Pixels déjà décodés, réutilisés pendant un zoom
+        self.item = None  # Réservé à la vue : identifiant de l'item image sur le canvas
+        self.pending = False  # Décodage demandé au pool et pas encore reçu
+
+    @property
+    def top(self):
+        return self.slot.top + self.offset
+
+    @property
+    def bottom(self):
+        return self.top + self.height
+
+
+class DecodePool:
+    """Pool de décodage en arrière-plan avec remise des résultats au thread principal.
+
+    Les travaux sont exécutés dans un pool de threads (ou de processus) ; les
+    résultats terminés sont déposés dans une file que le thread Tk vide avec
+    drain(). Au plus max_pending travaux sont confiés au pool en même temps,
+    les autres attendent dans une file locale, par priorité croissante, et
+    peuvent encore être annulés ou repriorisés ; un travail confié au pool
+    peut encore être annulé tant qu'il n'a pas commencé. Un travail de priorité
+    positive (préchargement) n'est confié au pool que si un worker est libre :
+    il n'attend jamais dans la file de l'exécuteur, où un travail urgent
+    (priorité nulle ou négative, les pages visibles) passerait derrière lui.
+    stats() permet de vérifier que les pages visibles passent d'abord.
+    """
+    def __init__(self, workers=None, mode='thread', max_pending=8):
+        if workers is None:
+            workers = max(2, (os.cpu_count() or 2) - 1)
+        if mode == 'process':
+            from concurrent.futures import ProcessPoolExecutor
+            self.executor = ProcessPoolExecutor(max_workers=workers)
+        elif mode == 'thread':
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='decode')
+        else:
+            raise ValueError(f"Unknown decode pool mode: {mode}")
+        self.mode = mode
+        self.workers = workers
+        self.max_pending = max(1, max_pending)
+        self._backlog = []  # Tas de (priorité, ordre, clé, fonction, arguments, callback, date) pas encore soumis
+        self._sequence = itertools.count()  # Départage les priorités égales par ordre d'arrivée
+        self._in_flight = {}  # clé -> (callback, tracé, urgent, future) des travaux confiés au pool
+        self._prefetching = 0  # Travaux de préchargement parmi _in_flight
+        self._results = queue.Queue()  # Résultats terminés, consommés par drain()
+        self.reset_stats()
+
+    @property
+    def pending(self):
+        """Nombre de travaux en attente ou en cours"""
+        return len(self._backlog) + len(self._in_flight)
+
+    def submit(self, key, callback, func, *args, priority=0):
+        """Planifie func(*args) ; callback(result, error) sera appelé par drain().
+
+        Les plus petites priorités passent d'abord ; un travail déjà en
+        attente prend la nouvelle priorité.
+        """
+        if key in self._in_flight:
+            return
+        for index, job in enumerate(self._backlog):
+            if job[2] == key:
+                if job[0] != priority:
+                    self._backlog[index] = (priority,) + job[1:]
+                    heapq.heapify(self._backlog)
+                    self._pump()
+                return
+        self._submitted += 1
+        heapq.heappush(self._backlog, (priority, next(self._sequence), key, func, args, callback, time.perf_counter()))
+        self._pump()
+
+    def cancel(self, key):
+        """Retire un travail pas encore démarré ; retourne True s'il a été retiré"""
+        for index, job in enumerate(self._backlog):
+            if job[2] == key:
+                self._backlog[index] = self._backlog[-1]
+                self._backlog.pop()
+                heapq.heapify(self._backlog)
+                self._cancelled += 1
+                return True
+        # Confié au pool mais encore dans la file de l'exécuteur
+        job = self._in_flight.get(key)
+        if job is not None and job[3].cancel():
+            del self._in_flight[key]
+            if not job[2]:
+                self._prefetching -= 1
+            self._cancelled += 1
+            self._pump()
+            return True
+        return False
+
+    def reprioritize(self, priority_of):
+        """Recalcule la priorité des travaux en attente avec priority_of(clé) ; None garde l'ancienne"""
+        backlog = []
+        for job in self._backlog:
+            priority = priority_of(job[2])
+            backlog.append(job if priority is None else (priority,) + job[1:])
+        heapq.heapify(backlog)
+        self._backlog = backlog
+        self._pump()
+
+    def cancel_all(self):
+        """Oublie tous les travaux en attente et ignore les résultats en cours"""
+        self._cancelled += len(self._backlog)
+        self._backlog.clear()
+        for job in self._in_flight.values():
+            job[3].cancel()
+        self._in_flight.clear()
+        self._prefetching = 0
+
+    def _pump(self):
+        """Confie au pool les travaux en attente dans la limite de max_pending"""
+        while self._backlog and len(self._in_flight) < self.max_pending:
+            urgent = self._backlog[0][0] <= 0
+            if not urgent and len(self._in_flight) >= self.workers:
+                break
+            priority, _, key, func, args, callback, queued = heapq.heappop(self._backlog)
+            if urgent and self._prefetching and len(self._in_flight) >= self.workers:
+                # Tous les workers sont occupés, dont au moins un par un préchargement
+                self._urgent_behind_prefetch += 1
+            self._record_wait(urgent, time.perf_counter() - queued)
+            traced = instrumentation.enabled
+            if traced:
+                # Les événements du worker reviennent avec le résultat
+                future = self.executor.submit(instrumentation.traced_call, func, *args)
+            else:
+                future = self.executor.submit(func, *args)
+            # Les résultats ne sont lus que par drain(), sur ce même thread : l'entrée existe avant
+            self._in_flight[key] = (callback, traced, urgent, future)
+            if not urgent:
+                self._prefetching += 1
+            future.add_done_callback(lambda f, key=key: self._results.put((key, f)))
+
+    def _record_wait(self, urgent, wait):
+        kind = 'urgent' if urgent else 'prefetch'
+        count, total, worst = self._waits[kind]
+        self._waits[kind] = (count + 1, total + wait, max(worst, wait))
+
+    def reset_stats(self):
+        self._submitted = 0
+        self._cancelled = 0
+        self._completed = 0
+        self._stale = 0
+        self._urgent_behind_prefetch = 0
+        self._waits = {'urgent': (0, 0.0, 0.0), 'prefetch': (0, 0.0, 0.0)}
+
+    def stats(self):
+        """Compteurs de la file : travaux soumis, annulés, terminés, attente en file par catégorie.
+
+        urgent_behind_prefetch compte les travaux urgents qui ont dû attendre
+        la fin d'un préchargement déjà commencé (il n'est pas interrompu).
+        """
+        stats = {
+            'queued': len(self._backlog),
+            'urgent_queued': sum(1 for job in self._backlog if job[0] <= 0),
+            'in_flight': len(self._in_flight),
+            'prefetch_in_flight': self._prefetching,
+            'submitted': self._submitted,
+            'cancelled': self._cancelled,
+            'completed': self._completed,
+            'stale': self._stale,
+            'urgent_behind_prefetch': self._urgent_behind_prefetch,
+        }
+        for kind, (count, total, worst) in self._waits.items():
+            stats[f'{kind}_started'] = count
+            stats[f'{kind}_wait_ms'] = total / count * 1000 if count else 0.0
+            stats[f'{kind}_wait_max_ms'] = worst * 1000
+        return stats
+
+    def drain(self):
+        """Distribue les résultats terminés ; à appeler depuis le thread principal"""
+        delivered = 0
+        while True:
+            try:
+                key, future = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if future.cancelled():
+                continue
+            job = self._in_flight.pop(key, None)
+            if job is None:
+                # Travail abandonné par cancel_all() pendant son exécution
+                self._stale += 1
+                continue
+            callback, traced, urgent, _ = job
+            if not urgent:
+                self._prefetching -= 1
+            self._completed += 1
+            try:
+                result, error = future.result(), None
+                if traced:
+                    result, events = result
+                    instrumentation.replay(events)
+            except Exception as e:
+                result, error = None, e
+            callback(result, error)
+            delivered += 1
+        self._pump()
+        return delivered
+
+    def shutdown(self):
+        self.cancel_all()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ImageCache:
+    """Cache LRU d'images borné par un budget mémoire en octets.
+
+    Chaque entrée est comptée largeur × hauteur × 4 octets, ce qui correspond
+    à la représentation RGBA d'une image Tk.
+    """
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # clé -> (image, coût en octets)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        """Retourne l'image associée à la clé, ou None, et met à jour les compteurs"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            if instrumentation.enabled:
+                instrumentation.event('cache_miss', page=key[0])
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        if instrumentation.enabled:
+            instrumentation.event('cache_hit', page=key[0])
+        return entry[0]
+
+    def put(self, key, image, width, height):
+        """Ajoute une image puis évince les moins récemment utilisées si besoin"""
+        cost = width * height * 4
+        if key in self._entries:
+            self.current_bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (image, cost)
+        self.current_bytes += cost
+        # L'entrée qu'on vient d'ajouter est conservée même si elle dépasse le budget seule
+        self._evict(keep=1)
+
+    def resize(self, max_bytes):
+        """Change le budget et évince immédiatement ce qui le dépasse"""
+        self.max_bytes = max_bytes
+        self._evict(keep=0)
+
+    def _evict(self, keep):
+        while self.current_bytes > self.max_bytes and len(self._entries) > keep:
+            evicted_key, (_, evicted_cost) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_cost
+            self.evictions += 1
+            if instrumentation.enabled:
+                instrumentation.event('cache_evict', page=evicted_key[0], bytes=evicted_cost)
+
+    def discard(self, key):
+        """Retire une entrée si elle est présente"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[1]
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def stats(self):
+        """Compteurs du cache, pour le diagnostic"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+class DiskPageCache:
+    """Cache persistant des pages redimensionnées, stocké dans une base SQLite.
+
+    Les entrées sont indexées par (chemin, largeur, qualité, tuile) et mémorisent la date de
+    modification et la taille du fichier source : une entrée dont la source a
+    changé est supprimée à la lecture. Les pixels sont compressés avec zlib et
+    vérifiés par CRC32. Au-delà de max_bytes, les entrées les moins récemment
+    lues sont évincées. Une connexion est ouverte par thread.
+
+    Le plafond est enregistré dans la base : il vaut pour tous les processus
+    qui l'utilisent (le lecteur, les workers de --prerender). Un max_bytes
+    passé au constructeur ou à set_max_bytes() le remplace ; sinon, la valeur
+    enregistrée est reprise, ou DEFAULT_MAX_BYTES.
+    """
+    DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+    SCHEMA_VERSION = 3
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pages (
+            path TEXT NOT NULL,
+            width INTEGER NOT NULL,
+            quality TEXT NOT NULL,
+            tile INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            file_size INTEGER NOT NULL,
+            out_width INTEGER NOT NULL,
+            out_height INTEGER NOT NULL,
+            checksum INTEGER NOT NULL,
+            nbytes INTEGER NOT NULL,
+            last_access REAL NOT NULL,
+            data BLOB NOT NULL,
+            PRIMARY KEY (path, width, quality, tile)
+        );
+        CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access);
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    """
+    ENFORCE_EVERY = 32  # Nombre d'écritures entre deux vérifications de la taille
+
+    def __init__(self, db_path, max_bytes=None):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            # Un cache d'un format antérieur est simplement recréé
+            if conn.execute('PRAGMA user_version').fetchone()[0] != self.SCHEMA_VERSION:
+                conn.execute('DROP TABLE IF EXISTS pages')
+                conn.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+            conn.executescript(self.SCHEMA)
+        if max_bytes is None:
+            self.max_bytes = self._stored_max_bytes()
+        else:
+            self.set_max_bytes(max_bytes)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, path, width, quality, tile, stat):
+        """Retourne ((largeur, hauteur), octets RGB) ou None si absent ou périmé"""
+        conn = self._connection()
+        row = conn.execute(
+            'SELECT mtime_ns, file_size, out_width, out_height, checksum, data FROM pages '
+            'WHERE path = ? AND width = ? AND quality = ? AND tile = ?', (path, width, quality, tile)).fetchone()
+        if row is None:
+            return None
+        mtime_ns, file_size, out_width, out_height, checksum, blob = row
+        data = None
+        if mtime_ns == stat.st_mtime_ns and file_size == stat.st_size:
+            try:
+                data = zlib.decompress(blob)
+            except zlib.error:
+                data = None
+            if data is not None and (zlib.crc32(data) != checksum or len(data) != out_width * out_height * 3):
+                data = None
+        with conn:
+            if data is None:
+                # Source modifiée ou entrée corrompue : on l'oublie
+                conn.execute('DELETE FROM pages WHERE path = ? AND width = ? AND quality = ? AND tile = ?',
+                             (path, width, quality, tile))
+                return None
+            conn.execute('UPDATE pages SET last_access = ? WHERE path = ? AND width = ? AND quality = ? AND tile = ?',
+                         (time.time(), path, width, quality, tile))
+        return (out_width, out_height), data
+
+    def contains(self, path, width, quality, tile, stat):
+        """True si une entrée à jour existe, sans lire ses pixels"""
+        row = self._connection().execute(
+            'SELECT mtime_ns, file_size FROM pages WHERE path = ? AND width = ? AND quality = ? AND tile = ?',
+            (path, width, quality, tile)).fetchone()
+        return row is not None and row[0] == stat.st_mtime_ns and row[1] == stat.st_size
+
+    def put(self, path, width, quality, tile, stat, size, data):
+        """Enregistre le rendu d'une page"""
+        blob = zlib.compress(data, 1)
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO pages (path, width, quality, tile, mtime_ns, file_size, out_width, '
+                'out_height, checksum, nbytes, last_access, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (path, width, quality, tile, stat.st_mtime_ns, stat.st_size, size[0], size[1],
+                 zlib.crc32(data), len(blob), time.time(), blob))
+        with self._lock:
+            self._writes += 1
+            enforce = self._writes % self.ENFORCE_EVERY == 0
+        if enforce:
+            self.enforce_limit()
+
+    def _stored_max_bytes(self):
+        row = self._connection().execute("SELECT value FROM settings WHERE key = 'max_bytes'").fetchone()
+        return row[0] if row is not None else self.DEFAULT_MAX_BYTES
+
+    def set_max_bytes(self, max_bytes):
+        """Change le plafond du cache, pour ce processus et les suivants"""
+        conn = self._connection()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('max_bytes', ?)", (max_bytes,))
+        self.max_bytes = max_bytes
+
+    def width_counts(self, quality):
+        """{largeur de rendu: nombre de pages en cache} pour une qualité, miniatures exclues"""
+        rows = self._connection().execute(
+            'SELECT width, COUNT(*) FROM pages WHERE quality = ? AND tile <= 0 GROUP BY width', (quality,))
+        return dict(rows.fetchall())
+
+    def total_bytes(self):
+        return self._connection().execute('SELECT COALESCE(SUM(nbytes), 0) FROM pages').fetchone()[0]
+
+    def enforce_limit(self):
+        """Évince les entrées les plus anciennes jusqu'à repasser sous 90 % du plafond"""
+        conn = self._connection()
+        # Le plafond a pu être changé par un autre processus
+        self.max_bytes = self._stored_max_bytes()
+        excess = self.total_bytes() - int(self.max_bytes * 0.9)
+        if excess <= 0:
+            return 0
+        evicted = 0
+        with conn:
+            for rowid, nbytes in conn.execute('SELECT rowid, nbytes FROM pages ORDER BY last_access').fetchall():
+                if excess <= 0:
+                    break
+                conn.execute('DELETE FROM pages WHERE rowid = ?', (rowid,))
+                excess -= nbytes
+                evicted += 1
+        return evicted
+
+    def clear(self):
+        conn = self._connection()
+        with conn:
+            conn.execute('DELETE FROM pages')
+        conn.execute('VACUUM')
+
+
+class _Animation:
+    """État de lecture d'une page animée"""
+    __slots__ = ('token', 'path', 'width', 'quality', 'on_frame', 'frame', 'n_frames', 'durations', 'due',
+                 'pending', 'batch')
+    _tokens = itertools.count()
+
+    def __init__(self, path, width, quality, on_frame):
+        self.token = next(self._tokens)  # Distingue deux lectures successives sous la même clé
+        self.path = path
+        self.width = width
+        self.quality = quality
+        self.on_frame = on_frame  # Appelé avec l'image affichable de chaque nouvelle image
+        self.frame = 0  # Image affichée ; la première vient du rendu normal de la page
+        self.n_frames = None  # Connu après le premier lot décodé
+        self.durations = {}  # index -> durée en ms
+        self.due = None  # Heure (time.monotonic) du passage à l'image suivante
+        self.pending = None  # Index du lot en cours de décodage
+        self.batch = {}  # Dernier lot reçu (index -> image), gardé jusqu'au suivant même si le cache l'évince
+
+
+class AnimationScheduler:
+    """Lecture de toutes les pages animées avec un seul minuteur.
+
+    Les images sont décodées par lots de FRAME_BATCH dans le DecodePool, à
+    la demande, et gardées dans un ImageCache dont le budget est partagé par
+    toutes les animations ; une image évincée est simplement redécodée. Un
+    lot est réduit pour tenir dans ce budget, et le dernier lot reçu reste
+    attaché à son animation : il est toujours affiché en entier, même quand
+    d'autres animations remplissent le cache.
+    schedule(délai en ms) doit programmer un appel unique à tick() (root.after
+    pour Tk) ; un nouvel appel remplace le précédent. stop() libère les images
+    d'une animation, par exemple quand elle sort de l'écran.
+    """
+    FRAME_BATCH = 8
+
+    def __init__(self, pool, create_image, schedule, max_bytes=64 * 1024 * 1024):
+        self.pool = pool
+        self.create_image = create_image
+        self.schedule = schedule
+        self.frames = ImageCache(max_bytes)
+        self._players = {}  # clé de l'appelant -> _Animation
+
+    def __contains__(self, key):
+        return key in self._players
+
+    def __len__(self):
+        return len(self._players)
+
+    def play(self, key, path, width, quality, on_frame):
+        """Démarre l'animation d'une page dont la première image est déjà affichée"""
+        if key in self._players:
+            return
+        animation = self._players[key] = _Animation(path, width, quality, on_frame)
+        self._request(key, animation, 0)
+
+    def stop(self, key):
+        """Met une animation en pause et libère ses images décodées"""
+        animation = self._players.pop(key, None)
+        if animation is None:
+            return
+        if animation.pending is not None:
+            self.pool.cancel(self._job_key(key, animation, animation.pending))
+        for index in range(animation.n_frames or 0):
+            self.frames.discard(self._frame_key(animation, index))
+
+    def stop_all(self):
+        for key in list(self._players):
+            self.stop(key)
+
+    def _frame_key(self, animation, index):
+        return (animation.path, animation.width, animation.quality, 'frame', index)
+
+    def _job_key(self, key, animation, first):
+        # Un lot encore en cours pour une lecture arrêtée ne doit pas masquer celui de la suivante
+        return ('frames', key, animation.token, animation.path, animation.width, first)
+
+    def _request(self, key, animation, first):
+        """Demande au pool le décodage du lot qui commence à l'image first"""
+        if animation.pending is not None:
+            return
+        animation.pending = first
+        self.pool.submit(self._job_key(key, animation, first),
+                         lambda result, error: self._on_frames(key, animation, first, result, error),
+                         render_frames, animation.path, animation.width, first, self.FRAME_BATCH,
+                         animation.quality, self.frames.max_bytes)
+
+    def _on_frames(self, key, animation, first, result, error):
+        from PIL import Image
+
+        # L'animation a été arrêtée entre-temps
+        if self._players.get(key) is not animation:
+            return
+        animation.pending = None
+        if error is not None:
+            print(f"Error decoding frames of {animation.path}: {error}")
+            del self._players[key]
+            return
+        n_frames, frames = result
+        animation.n_frames = n_frames
+        if n_frames < 2:
+            del self._players[key]
+            return
+        animation.batch = {}
+        for offset, (duration, size, data) in enumerate(frames):
+            index = first + offset
+            animation.durations[index] = duration
+            photo = animation.batch[index] = self.create_image(Image.frombytes('RGB', size, data))
+            self.frames.put(self._frame_key(animation, index), photo, *size)
+        if animation.due is None:
+            animation.due = time.monotonic() + animation.durations.get(0, DEFAULT_FRAME_DURATION) / 1000
+        self.tick()
+
+    def tick(self):
+        """Passe à l'image suivante des animations arrivées à échéance et reprogramme le minuteur"""
+        now = time.monotonic()
+        next_due = None
+        for key, animation in list(self._players.items()):
+            if animation.due is None:
+                continue
+            if animation.due <= now:
+                following = (animation.frame + 1) % animation.n_frames
+                photo = animation.batch.get(following)
+                if photo is None:
+                    photo = self.frames.get(self._frame_key(animation, following))
+                if photo is None:
+                    # Image pas encore décodée ou évincée : on attend le lot
+                    self._request(key, animation, following)
+                    continue
+                animation.frame = following
+                # Sans dériver, mais sans rattraper les images manquées après une pause
+                animation.due = max(animation.due + animation.durations[following] / 1000, now)
+                animation.on_frame(photo)
+                lookahead = (following + 1) % animation.n_frames
+                if lookahead not in animation.batch and self._frame_key(animation, lookahead) not in self.frames:
+                    self._request(key, animation, lookahead)
+            if next_due is None or animation.due < next_due:
+                next_due = animation.due
+        if next_due is not None:
+            self.schedule(max(1, int((next_due - now) * 1000)))
+
+
+class ReaderEngine:
+    """Chargement et mise en page d'un chapitre, indépendants de l'interface.
+
+    Le moteur gère la mise en page (ChapterLayout), le découpage en tuiles,
+    les décodages demandés au DecodePool, le cache d'images et la libération
+    des pages éloignées du viewport. L'affichage est délégué à une vue qui
+    fournit :
+
+    - create_page_image(image PIL) -> image affichable (PhotoImage pour Tk) ;
+    - page_image_pixels(image affichable) -> image PIL, pour l'aperçu de zoom ;
+    - show_tile(tile) et hide_tile(tile) ; show_tile est aussi appelé à
+      chaque nouvelle image d'une page animée ;
+    - page_failed(slot), appelé quand une page ne peut pas être décodée ;
+    - schedule_tick(délai en ms), qui programme l'appel de tick_animations().
+
+    L'interface appelle update_viewport() à chaque défilement et poll()
+    régulièrement pour recevoir les pages décodées ; sans interface, le banc
+    d'essai fait de même avec une vue minimale. Les pages animées ne sont
+    lues que lorsqu'elles recoupent le viewport.
+
+    Les pages sont rendues à la tranche de largeur qui contient la largeur
+    de lecture (bucket_width) puis réduites : les largeurs voisines partagent
+    les entrées du cache disque.
+
+    Avec progressive, un aperçu flou (render_preview) est demandé avant
+    chaque rendu complet et affiché à la taille finale de la tuile : le
+    rendu complet le remplace sans modifier la mise en page.
+
+    Les décodages sont priorisés par distance au viewport (les tuiles
+    visibles d'abord, celles qui sont derrière le sens du défilement en
+    dernier). La fenêtre de préchargement s'élargit devant avec la vitesse de
+    défilement et se réduit derrière ; un décodage pas encore commencé est
+    abandonné dès que sa tuile sort de la fenêtre. queue_metrics() expose
+    l'état de la file.
+    """
+    def __init__(self, view, pool, image_cache, disk_cache_path=None, quality='fast',
+                 render_margin=1.0, release_margin=3.0, frame_cache_bytes=64 * 1024 * 1024, progressive=True,
+                 manifest_dir=None):
+        self.view = view
+        self.pool = pool
+        self.image_cache = image_cache
+        self.disk_cache_path = disk_cache_path
+        self.manifest_dir = manifest_dir  # Manifestes des chapitres (voir load_chapter_layout), None pour aucun
+        self.quality = quality
+        self.progressive = progressive
+        self.render_margin = render_margin  # Marge de décodage, en hauteurs de viewport
+        self.release_margin = release_margin  # Au-delà de cette marge, les tuiles sont libérées
+        self.max_prefetch_margin = 4.0  # Marge maximale devant le défilement, en hauteurs de viewport
+        self.prefetch_lookahead = 0.5  # s de défilement à la vitesse courante ajoutées à la marge devant
+        self.velocity_smoothing = 0.1  # s, constante de temps du lissage de la vitesse
+        self.behind_penalty = 3  # Les tuiles derrière le défilement comptent pour une distance triple
+        self.velocity = 0.0  # Vitesse de défilement lissée, en pixels par seconde (positive vers le bas)
+        self.margins = (render_margin, render_margin)  # Marges (devant, derrière) courantes
+        self._last_scroll = None  # (haut du viewport, date) de la dernière mise à jour
+        self._dropped = 0  # Décodages abandonnés avant d'avoir commencé
+        self._stale = 0  # Décodages terminés pour une tuile qui n'en avait plus besoin
+        self.memory_level = 0  # Niveau de dégradation appliqué (voir set_memory_level)
+        self._normal_settings = None  # Budgets et marges d'origine, gardés au premier changement de niveau
+        self.layout = None
+        self.slots = []
+        self.width = None
+        self.render_width = None  # Largeur des rendus décodés, réduits à self.width (voir bucket_width)
+        self.settling = False  # Pendant une rafale de zoom, seuls les aperçus sont affichés
+        self.active_tiles = set()  # Tuiles décodées ou en cours de décodage
+        self.chapters = []  # [(chapitre, nombre de pages)] dans l'ordre de lecture
+        self._generation = 0
+        # Un seul minuteur pour toutes les animations, partagé avec la vue image par image
+        self.animations = AnimationScheduler(pool, view.create_page_image, view.schedule_tick, frame_cache_bytes)
+        self._playing = set()  # Pages animées en cours de lecture
+        self._viewport = (0, 0)
+
+    def open_chapter(self, paths, width, chapter=None):
+        """Prépare un chapitre à partir des seules en-têtes ; retourne la hauteur totale.
+
+        chapter identifie le chapitre (dossier ou archive) pour la lecture continue.
+        """
+        self.close_chapter()
+        self.layout = load_chapter_layout(paths, self.manifest_dir)
+        self.slots = [PageSlot(index, path, kind) for index, (path, kind, _) in enumerate(self.layout.pages)]
+        self.chapters = [(chapter, len(self.slots))]
+        return self.set_width(width)
+
+    def append_chapter(self, layout, chapter=None):
+        """Ajoute à la suite un chapitre dont les en-têtes ont été lues (load_chapter_layout).
+
+        Les pages déjà affichées ne bougent pas ; retourne la nouvelle hauteur totale.
+        """
+        start = len(self.slots)
+        self.layout.extend(layout.pages)
+        self.slots.extend(PageSlot(start + index, path, kind) for index, (path, kind, _) in enumerate(layout.pages))
+        self.chapters.append((chapter, len(layout.pages)))
+        return self.set_width(self.width)
+
+    def chapter_index(self, page_index):
+        """Rang, dans self.chapters, du chapitre qui contient une page"""
+        for index, (_, count) in enumerate(self.chapters):
+            if page_index < count:
+                return index
+            page_index -= count
+        return len(self.chapters) - 1
+
+    def evict_chapters(self, view_top, keep_behind=1):
+        """Retire les chapitres lus au-dessus du viewport, sauf les keep_behind plus récents.
+
+        Les pages restantes remontent d'autant : retourne la hauteur retirée,
+        à soustraire de la position de défilement.
+        """
+        drop = self.chapter_index(self.page_at(view_top)) - keep_behind
+        if drop <= 0:
+            return 0
+        count = sum(pages for _, pages in self.chapters[:drop])
+        removed = self.slots[count].top
+        # Les indices des pages changent : les décodages en cours sont abandonnés puis redemandés
+        self.cancel_jobs()
+        for slot in self.slots[:count]:
+            for tile in slot.tiles:
+                self.release_tile(tile)
+        del self.slots[:count]
+        del self.chapters[:drop]
+        self.layout.drop_front(count)
+        for index, slot in enumerate(self.slots):
+            slot.index = index
+            slot.tag = f"page_{index}"
+        self.set_width(self.width)
+        return removed
+
+    def close_chapter(self):
+        """Oublie le chapitre courant et les décodages en attente"""
+        self.cancel_jobs()
+        self.settling = False
+        self.active_tiles.clear()
+        self.layout = None
+        self.slots = []
+        self.chapters = []
+
+    @property
+    def total_height(self):
+        return self.layout.total_height if self.layout else 0
+
+    def set_width(self, width):
+        """Calcule la position de chaque page pour une largeur donnée ; retourne la hauteur totale"""
+        self.width = width
+        self.render_width = bucket_width(width)
+        # Les positions changent : l'écart avec la mise à jour précédente n'est pas un défilement
+        self._last_scroll = None
+        layout = self.layout
+        layout.set_width(width)
+        for slot in self.slots:
+            slot.top = layout.offset(slot.index)
+            slot.height = layout.height(slot.index)
+            if slot.kind in PIXEL_KINDS:
+                self._layout_tiles(slot)
+        return layout.total_height
+
+    def _layout_tiles(self, slot):
+        """Découpe une page en tuiles selon sa hauteur à la largeur de rendu"""
+        bands = scaled_tiles(slot.height, self.layout.scaled_height(slot.index, self.render_width))
+        # Découpage inchangé (ajout d'un chapitre, par exemple) : les tuiles décodées sont gardées
+        if bands and [(tile.offset, tile.height) for tile in slot.tiles] == bands:
+            return
+        if not bands:
+            # Une page normale garde sa tuile, et donc ses pixels pour l'aperçu de zoom
+            if len(slot.tiles) == 1 and slot.tiles[0].index == -1:
+                slot.tiles[0].height = slot.height
+                return
+            bands = [(0, slot.height)]
+            indices = [-1]
+        else:
+            indices = range(len(bands))
+        for tile in slot.tiles:
+            self.release_tile(tile)
+        slot.tiles = [PageTile(slot, index, offset, height) for index, (offset, height) in zip(indices, bands)]
+
+    def page_at(self, y):
+        """Index de la page qui contient l'ordonnée y"""
+        return self.layout.page_at(y) if self.slots else -1
+
+    def anchor(self, view_top):
+        """Retourne (index de la page en haut de l'écran, position relative dans la page)"""
+        if not self.slots:
+            return None
+        slot = self.slots[self.layout.page_at(view_top)]
+        return slot.index, (view_top - slot.top) / max(slot.height, 1)
+
+    def relayout(self, width, view_top, view_height):
+        """Change la largeur de lecture en gardant la page du haut de l'écran.
+
+        Les tuiles visibles sont immédiatement redimensionnées à partir des
+        pixels déjà décodés (aperçu bilinéaire), les autres sont libérées.
+        Retourne la nouvelle ordonnée du haut de l'écran.
+        """
+        anchor = self.anchor(view_top)
+        self.cancel_jobs()
+        self.set_width(width)
+        if anchor is not None:
+            index, fraction = anchor
+            view_top = self.slots[index].top + fraction * self.slots[index].height
+        else:
+            view_top = 0
+        view_bottom = view_top + view_height
+        for tile in list(self.active_tiles):
+            if tile.photo is None:
+                continue
+            if tile.bottom >= view_top and tile.top <= view_bottom:
+                self._preview_tile(tile)
+            else:
+                self.release_tile(tile)
+        return view_top
+
+    def _preview_tile(self, tile):
+        """Redimensionne rapidement les pixels déjà affichés à la nouvelle largeur"""
+        from PIL import Image
+
+        try:
+            if tile.source is None:
+                tile.source = self.view.page_image_pixels(tile.photo)
+            preview = tile.source.resize((self.width, tile.height), Image.BILINEAR)
+            tile.photo = self.view.create_page_image(preview)
+            tile.sharp = False
+        except Exception as e:
+            print(f"Error rescaling {tile.slot.path}: {e}")
+            self.release_tile(tile)
+
+    def refresh(self):
+        """Redemande le rendu des tuiles chargées, par exemple après un changement de qualité"""
+        self.cancel_jobs()
+        for tile in self.active_tiles:
+            tile.sharp = False
+
+    def cancel_jobs(self):
+        """Annule les décodages en attente ; les résultats déjà en cours seront ignorés"""
+        for slot in list(self._playing):
+            self._stop_animation(slot)
+        for tile in list(self.active_tiles):
+            if tile.pending:
+                self.pool.cancel(self._tile_key(tile))
+                self.pool.cancel(self._preview_key(tile))
+                tile.pending = False
+                if tile.photo is None:
+                    self.active_tiles.discard(tile)
+        self._generation += 1
+
+    def update_viewport(self, view_top, view_height):
+        """Décode les tuiles proches du viewport et libère celles qui en sont loin"""
+        if not self.slots:
+            return
+        view_height = max(view_height, 1)
+        view_bottom = view_top + view_height
+        self._viewport = (view_top, view_bottom)
+        self._update_velocity(view_top)
+        ahead, behind = self.margins = self.prefetch_margins(view_height)
+        above, below = (ahead, behind) if self.velocity < 0 else (behind, ahead)
+        load_top = view_top - view_height * above
+        load_bottom = view_bottom + view_height * below
+        keep_top = view_top - view_height * max(self.release_margin, above)
+        keep_bottom = view_bottom + view_height * max(self.release_margin, below)
+        
+        # Seules les pages proches du viewport et les tuiles déjà chargées sont parcourues
+        first, last = self.layout.visible_range(load_top, load_bottom)
+        if not self.settling:
+            self._drop_jobs(load_top, load_bottom)
+            wanted = []
+            for slot in self.slots[first:last + 1]:
+                if slot.kind not in PIXEL_KINDS:
+                    continue
+                for tile in slot.tiles:
+                    if tile.bottom >= load_top and tile.top <= load_bottom and not tile.sharp:
+                        wanted.append(tile)
+                    elif tile.sharp and slot.kind == 'animation':
+                        self._update_animation(slot)
+            self._load_tiles(wanted)
+        for tile in list(self.active_tiles):
+            if tile.bottom < keep_top or tile.top > keep_bottom:
+                self.release_tile(tile)
+        # Les animations sorties de l'écran sont mises en pause, même dans la marge de décodage
+        for slot in list(self._playing):
+            self._update_animation(slot)
+
+    def _update_velocity(self, view_top):
+        """Lisse la vitesse de défilement à partir des positions successives du viewport"""
+        now = time.perf_counter()
+        last, self._last_scroll = self._last_scroll, (view_top, now)
+        if last is None or now <= last[1]:
+            return
+        elapsed = now - last[1]
+        speed = (view_top - last[0]) / elapsed
+        # Moyenne exponentielle pondérée par le temps : une pause ramène la vitesse à zéro
+        self.velocity += (speed - self.velocity) * min(1.0, elapsed / self.velocity_smoothing)
+
+    def prefetch_margins(self, view_height):
+        """Marges de décodage (devant, derrière le défilement) en hauteurs de viewport, selon la vitesse"""
+        speed = abs(self.velocity) / max(view_height, 1)  # Viewports par seconde
+        ahead = min(self.max_prefetch_margin, self.render_margin + speed * self.prefetch_lookahead)
+        return ahead, self.render_margin / (1 + speed)
+
+    def _tile_priority(self, tile, preview=False):
+        """Priorité du décodage d'une tuile : négative si elle est visible, sinon sa distance au viewport"""
+        view_top, view_bottom = self._viewport
+        if tile.bottom > view_top and tile.top < view_bottom:
+            return -2 if preview else -1
+        if tile.top >= view_bottom:
+            distance, behind = tile.top - view_bottom, self.velocity < 0
+        else:
+            # Sans défilement, le sens de lecture est vers le bas
+            distance, behind = view_top - tile.bottom, self.velocity >= 0
+        return 1 + distance * (self.behind_penalty if behind else 1)
+
+    def _drop_jobs(self, load_top, load_bottom):
+        """Abandonne les décodages pas encore commencés des tuiles sorties de la fenêtre, reclasse les autres"""
+        priorities = {}
+        for tile in list(self.active_tiles):
+            if not tile.pending:
+                continue
+            if tile.bottom < load_top or tile.top > load_bottom:
+                if self.pool.cancel(self._tile_key(tile)):
+                    self.pool.cancel(self._preview_key(tile))
+                    tile.pending = False
+                    self._dropped += 1
+                    if tile.photo is None:
+                        self.active_tiles.discard(tile)
+                    continue
+            priorities[self._tile_key(tile)] = self._tile_priority(tile)
+            priorities[self._preview_key(tile)] = self._tile_priority(tile, preview=True)
+        if priorities:
+            self.pool.reprioritize(priorities.get)
+
+    def set_memory_level(self, level):
+        """Réduit la mémoire du moteur selon un niveau de resources.MemoryGovernor.
+
+        Dès le niveau 1, les caches d'images et d'animations passent au quart
+        de leur budget ; dès le niveau 2, seules les pages à l'écran restent
+        décodées (plus de préchargement) et les autres sont libérées tout de
+        suite. Le passage en redimensionnement rapide du niveau 3 est laissé
+        à l'interface, qui affiche la qualité choisie. Le niveau 0 rétablit
+        les réglages d'origine.
+        """
+        if self._normal_settings is None:
+            self._normal_settings = (self.image_cache.max_bytes, self.animations.frames.max_bytes,
+                                     self.render_margin, self.release_margin, self.max_prefetch_margin)
+        cache_bytes, frame_bytes, render_margin, release_margin, max_prefetch_margin = self._normal_settings
+        shrink = 4 if level >= 1 else 1
+        self.image_cache.resize(cache_bytes // shrink)
+        self.animations.frames.resize(frame_bytes // shrink)
+        if level >= 2:
+            self.render_margin, self.release_margin, self.max_prefetch_margin = 0.0, 0.0, 0.0
+        else:
+            self.render_margin, self.release_margin = render_margin, release_margin
+            self.max_prefetch_margin = max_prefetch_margin
+        self.memory_level = level
+        if level >= 2:
+            view_top, view_bottom = self._viewport
+            for tile in list(self.active_tiles):
+                if tile.bottom <= view_top or tile.top >= view_bottom:
+                    self.release_tile(tile)
+
+    def queue_metrics(self):
+        """État de la file de décodage (voir DecodePool.stats) et de la fenêtre de préchargement"""
+        metrics = self.pool.stats()
+        view_top, view_bottom = self._viewport
+        metrics.update(
+            visible_pending=sum(1 for tile in self.active_tiles
+                                if tile.pending and tile.bottom > view_top and tile.top < view_bottom),
+            dropped=self._dropped,
+            stale_results=self._stale,
+            velocity=self.velocity,
+            prefetch_ahead=self.margins[0],
+            prefetch_behind=self.margins[1],
+        )
+        return metrics
+
+    def tick_animations(self):
+        """Avance les animations arrivées à échéance ; appelé par le minuteur de la vue"""
+        self.animations.tick()
+
+    def _update_animation(self, slot):
+        """Lit une page animée si elle recoupe le viewport, la met en pause sinon"""
+        view_top, view_bottom = self._viewport
+        visible = slot.bottom > view_top and slot.top < view_bottom
+        # Les pages animées découpées en tuiles restent fixes
+        if visible and not self.settling and len(slot.tiles) == 1 and slot.tiles[0].sharp:
+            if slot not in self._playing:
+                tile = slot.tiles[0]
+                self._playing.add(slot)
+                self.animations.play(('page', slot.index), slot.path, self.width, self.quality,
+                                     lambda photo: self._show_frame(tile, photo))
+        elif slot in self._playing:
+            self._stop_animation(slot)
+
+    def _stop_animation(self, slot):
+        self._playing.discard(slot)
+        self.animations.stop(('page', slot.index))
+
+    def _show_frame(self, tile, photo):
+        """Remplace l'image affichée d'une page animée par l'image suivante"""
+        tile.photo = photo
+        tile.source = None
+        self.view.show_tile(tile)
+
+    def visible_tiles(self, view_top, view_height):
+        """Tuiles d'images qui recoupent le viewport"""
+        if not self.slots:
+            return []
+        view_bottom = view_top + view_height
+        first, last = self.layout.visible_range(view_top, view_bottom)
+        return [tile for slot in self.slots[first:last + 1] for tile in slot.tiles
+                if tile.bottom > view_top and tile.top < view_bottom]
+
+    def poll(self):
+        """Distribue les décodages terminés ; à appeler depuis le thread de l'interface"""
+        return self.pool.drain()
+
+    def _render_key(self, tile):
+        """Clé du cache d'images pour le rendu courant d'une tuile"""
+        return (tile.slot.path, self.width, self.quality, tile.index)
+
+    def _tile_key(self, tile):
+        return ('page', self._generation, tile.slot.index, tile.index)
+
+    def _preview_key(self, tile):
+        return ('preview', self._generation, tile.slot.index, tile.index)
+
+    def _load_tiles(self, tiles):
+        """Demande le rendu des tuiles ; tous les aperçus passent avant les rendus complets"""
+        queued = []
+        for tile in tiles:
+            if tile.pending:
+                continue
+            photo = self.image_cache.get(self._render_key(tile))
+            if photo is not None:
+                self._show_tile(tile, photo)
+            else:
+                queued.append(tile)
+        if self.progressive:
+            view_top, view_bottom = self._viewport
+            for tile in queued:
+                # Seules les tuiles à l'écran en ont besoin, sauf si elles affichent déjà des pixels
+                if tile.photo is None and tile.bottom > view_top and tile.top < view_bottom:
+                    self._load_preview(tile)
+        for tile in queued:
+            self._load_tile(tile)
+
+    def _load_preview(self, tile):
+        generation = self._generation
+        self.pool.submit(self._preview_key(tile),
+                         lambda result, error: self._on_preview_decoded(generation, tile, result, error),
+                         render_preview, tile.slot.path, self.width, tile.slot.height, self.disk_cache_path,
+                         self.quality, tile.index, self.render_width, (tile.offset, tile.height),
+                         priority=self._tile_priority(tile, preview=True))
+
+    def _on_preview_decoded(self, generation, tile, result, error):
+        """Affiche l'aperçu d'une tuile si son rendu complet n'est pas encore arrivé"""
+        if generation != self._generation or not tile.pending or tile.sharp or tile.photo is not None:
+            return
+        # Pas d'aperçu bon marché pour ce format : la tuile attend le rendu complet
+        if error is not None or result is None:
+            return
+        from PIL import Image
+
+        size, data = result
+        with instrumentation.span('photoimage', page=tile.slot.path, tile=tile.index, preview=True):
+            tile.photo = self.view.create_page_image(Image.frombytes('RGB', size, data))
+        self.view.show_tile(tile)
+
+    def _load_tile(self, tile):
+        """Demande au pool le décodage d'une tuile à la largeur de lecture"""
+        tile.pending = True
+        self.active_tiles.add(tile)
+        generation = self._generation
+        self.pool.submit(self._tile_key(tile),
+                         lambda result, error: self._on_tile_decoded(generation, tile, result, error),
+                         render_scaled, tile.slot.path, self.width, tile.height, self.render_width,
+                         self.disk_cache_path, self.quality, tile.index, priority=self._tile_priority(tile))
+
+    def _on_tile_decoded(self, generation, tile, result, error):
+        """Crée l'image affichable d'une tuile décodée"""
+        # Le chapitre a été reconstruit ou la tuile libérée entre-temps
+        if generation != self._generation or not tile.pending:
+            self._stale += 1
+            return
+        tile.pending = False
+        slot = tile.slot
+        if error is not None:
+            print(f"Error loading {slot.path}: {error}")
+            for other in slot.tiles:
+                self.release_tile(other)
+            slot.kind = 'error'
+            self.view.page_failed(slot)
+            return
+        from PIL import Image
+
+        size, data = result
+        with instrumentation.span('photoimage', page=slot.path, tile=tile.index):
+            photo = self.view.create_page_image(Image.frombytes('RGB', size, data))
+        self.image_cache.put(self._render_key(tile), photo, *size)
+        self._show_tile(tile, photo)
+
+    def _show_tile(self, tile, photo):
+        """Affiche le rendu final d'une tuile, à la place de son éventuel aperçu"""
+        tile.photo = photo
+        tile.sharp = True
+        tile.source = None
+        self.active_tiles.add(tile)
+        with instrumentation.span('widget', page=tile.slot.path, tile=tile.index):
+            self.view.show_tile(tile)
+        if tile.slot.kind == 'animation':
+            self._update_animation(tile.slot)
+
+    def release_tile(self, tile):
+        """Libère l'image décodée d'une tuile sortie du voisinage du viewport"""
+        if tile.slot in self._playing:
+            self._stop_animation(tile.slot)
+        if tile.pending:
+            self.pool.cancel(self._tile_key(tile))
+            self.pool.cancel(self._preview_key(tile))
+            tile.pending = False
+        if tile.photo is not None:
+            self.view.hide_tile(tile)
+        tile.photo = None
+        tile.sharp = False
+        tile.source = None
+        self.active_tiles.discard(tile)
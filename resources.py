@@ -0,0 +1,121 @@
+"""Suivi des ressources du lecteur et plafond de mémoire.
+
+acquire() et release() comptent, depuis n'importe quel thread, les ressources
+ouvertes par type ('file' pour une page ouverte avec Pillow, 'archive' pour
+une archive gardée ouverte) ; snapshot() donne pour chacune le nombre
+courant et le maximum atteint. Avec un DecodePool en mode processus, les
+pages ouvertes par les workers sont comptées dans leur propre processus.
+
+rss_bytes() lit la mémoire résidente du processus ; MemoryGovernor en déduit
+un niveau de dégradation que le lecteur applique (voir
+ReaderEngine.set_memory_level) plutôt que de laisser le système swapper.
+"""
+import os
+import threading
+
+_lock = threading.Lock()
+_live = {}  # type -> [nombre courant, maximum atteint]
+
+
+def _reset_after_fork():
+    # Les ressources du parent ne sont pas celles de l'enfant (et le verrou a pu être copié pris)
+    global _lock, _live
+    _lock = threading.Lock()
+    _live = {}
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def acquire(kind):
+    with _lock:
+        counts = _live.setdefault(kind, [0, 0])
+        counts[0] += 1
+        counts[1] = max(counts[1], counts[0])
+
+
+def release(kind):
+    with _lock:
+        _live[kind][0] -= 1
+
+
+def snapshot():
+    """{type: (nombre ouvert, maximum atteint)}"""
+    with _lock:
+        return {kind: tuple(counts) for kind, counts in _live.items()}
+
+
+def _windows_rss():
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    get_info = ctypes.windll.psapi.GetProcessMemoryInfo
+    get_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(ProcessMemoryCounters), wintypes.DWORD]
+    if not get_info(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+        return None
+    return counters.WorkingSetSize
+
+
+def rss_bytes():
+    """Mémoire résidente actuelle du processus en octets, ou None si elle ne peut pas être lue"""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    if os.name == 'nt':
+        try:
+            return _windows_rss()
+        except (OSError, AttributeError):
+            return None
+    # macOS et autres : seulement avec psutil, dépendance optionnelle
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+class MemoryGovernor:
+    """Niveau de dégradation choisi d'après la mémoire résidente et un plafond.
+
+    Le niveau monte dès que le RSS atteint un seuil (fraction du plafond) et
+    ne redescend que d'un cran à la fois, quand le RSS repasse sous le seuil
+    moins recover_margin, pour ne pas osciller autour d'un seuil.
+    """
+    LEVELS = ('normal', 'small caches', 'on-screen pages only', 'fast resampling')
+
+    def __init__(self, ceiling_bytes, thresholds=(0.75, 0.85, 0.95), recover_margin=0.15):
+        self.ceiling_bytes = ceiling_bytes  # 0 ou None : pas de plafond
+        self.thresholds = thresholds  # Seuil d'entrée des niveaux 1, 2, 3
+        self.recover_margin = recover_margin
+        self.level = 0
+        self.rss = None  # Dernière mesure
+
+    def update(self, rss):
+        """Met à jour le niveau avec une mesure du RSS ; retourne le niveau"""
+        self.rss = rss
+        if rss is None or not self.ceiling_bytes:
+            return self.level
+        ratio = rss / self.ceiling_bytes
+        level = self.level
+        while level < len(self.thresholds) and ratio >= self.thresholds[level]:
+            level += 1
+        if level == self.level and level > 0 and ratio < self.thresholds[level - 1] - self.recover_margin:
+            level -= 1
+        self.level = level
+        return level
+
+    @property
+    def name(self):
+        return self.LEVELS[self.level]
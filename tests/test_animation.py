@@ -0,0 +1,59 @@
+import time
+
+import pytest
+from PIL import Image
+
+from reader_engine import AnimationScheduler, DecodePool
+
+
+@pytest.fixture
+def pool():
+    pool = DecodePool(workers=1)
+    yield pool
+    pool.shutdown()
+
+
+def make_gif(path, frames=12, size=(60, 40)):
+    images = [Image.new('RGB', size, (index * 20, 0, 0)) for index in range(frames)]
+    images[0].save(path, save_all=True, append_images=images[1:], duration=20, loop=0)
+    return str(path)
+
+
+def play_for(pool, scheduler, seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pool.drain()
+        scheduler.tick()
+        time.sleep(0.005)
+
+
+def test_animation_plays_and_loops(tmp_path, pool):
+    scheduler = AnimationScheduler(pool, lambda image: image, lambda delay: None)
+    shown = []
+    scheduler.play('page', make_gif(tmp_path / 'a.gif'), 60, 'fast', shown.append)
+    play_for(pool, scheduler, 1.0)
+    assert len(shown) > 12
+    scheduler.stop('page')
+    assert len(scheduler) == 0 and len(scheduler.frames) == 0
+
+
+def test_animation_advances_when_batch_exceeds_budget(tmp_path, pool):
+    # Deux images de 60×40 tiennent dans le budget, un lot complet non
+    scheduler = AnimationScheduler(pool, lambda image: image, lambda delay: None, max_bytes=2 * 60 * 40 * 4)
+    shown = []
+    scheduler.play('page', make_gif(tmp_path / 'a.gif'), 60, 'fast', shown.append)
+    play_for(pool, scheduler, 1.0)
+    assert len(shown) > 12
+    assert scheduler.frames.current_bytes <= scheduler.frames.max_bytes
+
+
+def test_restart_under_same_key_while_decoding(tmp_path, pool):
+    scheduler = AnimationScheduler(pool, lambda image: image, lambda delay: None)
+    first, second = make_gif(tmp_path / 'a.gif'), make_gif(tmp_path / 'b.gif', frames=5)
+    shown = []
+    scheduler.play('single', first, 60, 'fast', shown.append)
+    scheduler.stop('single')
+    scheduler.play('single', second, 60, 'fast', shown.append)
+    play_for(pool, scheduler, 0.5)
+    assert shown
+    assert scheduler._players['single'].n_frames == 5
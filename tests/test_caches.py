@@ -0,0 +1,77 @@
+import os
+import sqlite3
+import zlib
+
+from archives import PageStat
+from reader_engine import DiskPageCache, ImageCache
+
+
+def test_image_cache_lru_eviction():
+    cache = ImageCache(max_bytes=3 * 400)
+    for key in 'abc':
+        cache.put(key, key.upper(), 10, 10)
+    assert cache.get('a') == 'A'  # 'a' devient la plus récente
+    cache.put('d', 'D', 10, 10)
+    assert 'b' not in cache
+    assert all(key in cache for key in 'acd')
+    assert cache.stats()['evictions'] == 1
+
+
+def test_image_cache_keeps_oversized_entry_and_resize():
+    cache = ImageCache(max_bytes=100)
+    cache.put('big', 'B', 100, 100)
+    assert 'big' in cache
+    cache.resize(0)
+    assert len(cache) == 0 and cache.current_bytes == 0
+
+
+def make_disk_cache(tmp_path, max_bytes=None):
+    return DiskPageCache(str(tmp_path / 'pages.sqlite3'), max_bytes)
+
+
+def test_disk_cache_round_trip_and_staleness(tmp_path):
+    cache = make_disk_cache(tmp_path)
+    stat = PageStat(1, 10)
+    data = bytes(range(256)) * 3
+    cache.put('p.jpg', 480, 'fast', -1, stat, (16, 16), data)
+    assert cache.get('p.jpg', 480, 'fast', -1, stat) == ((16, 16), data)
+    assert cache.contains('p.jpg', 480, 'fast', -1, stat)
+    # Source modifiée : l'entrée est oubliée
+    assert cache.get('p.jpg', 480, 'fast', -1, PageStat(2, 10)) is None
+    assert not cache.contains('p.jpg', 480, 'fast', -1, stat)
+
+
+def test_disk_cache_rejects_corrupt_entry(tmp_path):
+    cache = make_disk_cache(tmp_path)
+    stat = PageStat(1, 10)
+    cache.put('p.jpg', 480, 'fast', -1, stat, (1, 1), b'abc')
+    conn = sqlite3.connect(cache.db_path)
+    with conn:
+        conn.execute('UPDATE pages SET data = ?', (zlib.compress(b'abd'),))
+    conn.close()
+    assert cache.get('p.jpg', 480, 'fast', -1, stat) is None
+
+
+def test_disk_cache_eviction_and_stored_limit(tmp_path):
+    cache = make_disk_cache(tmp_path, max_bytes=10 * 1024)
+    stat = PageStat(1, 10)
+    for index in range(20):
+        # Données incompressibles : chaque entrée occupe ~3 Ko
+        cache.put(f'{index}.jpg', 480, 'fast', -1, stat, (1, 1024), os.urandom(1024 * 3))
+    cache.enforce_limit()
+    assert cache.total_bytes() <= 10 * 1024
+    # Les entrées les plus récentes restent
+    assert cache.contains('19.jpg', 480, 'fast', -1, stat)
+    # Le plafond est repris par une nouvelle instance
+    assert make_disk_cache(tmp_path).max_bytes == 10 * 1024
+
+
+def test_disk_cache_width_counts(tmp_path):
+    cache = make_disk_cache(tmp_path)
+    stat = PageStat(1, 10)
+    for path in ('a', 'b'):
+        cache.put(path, 960, 'fast', -1, stat, (1, 1), b'abc')
+    cache.put('c', 960, 'fast', 0, stat, (1, 1), b'abc')
+    cache.put('c', 960, 'fast', 1, stat, (1, 1), b'abc')
+    cache.put('a', 160, 'preview', -1, stat, (1, 1), b'abc')
+    assert cache.width_counts('fast') == {960: 3}
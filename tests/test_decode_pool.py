@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from reader_engine import DecodePool
+
+
+@pytest.fixture
+def pool():
+    pool = DecodePool(workers=1, max_pending=1)
+    yield pool
+    pool.shutdown()
+
+
+def drain_until(pool, condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "decode jobs did not finish"
+        pool.drain()
+        time.sleep(0.005)
+
+
+def occupy(pool):
+    """Occupe l'unique worker jusqu'à ce que l'événement retourné soit levé"""
+    release = threading.Event()
+    done = []
+    pool.submit('blocker', lambda result, error: done.append(result), release.wait, priority=-10)
+    return release, done
+
+
+def test_jobs_run_by_priority(pool):
+    release, done = occupy(pool)
+    order = []
+    for key, priority in (('far', 5), ('near', 3), ('visible', -1)):
+        pool.submit(key, lambda result, error, key=key: order.append(key), lambda: None, priority=priority)
+    release.set()
+    drain_until(pool, lambda: len(order) == 3)
+    assert order == ['visible', 'near', 'far']
+    assert pool.stats()['completed'] == 4
+
+
+def test_cancel_and_reprioritize(pool):
+    release, done = occupy(pool)
+    order = []
+    for key, priority in (('a', 1), ('b', 2), ('c', 3)):
+        pool.submit(key, lambda result, error, key=key: order.append(key), lambda: None, priority=priority)
+    assert pool.cancel('b')
+    assert not pool.cancel('missing')
+    pool.reprioritize(lambda key: 0 if key == 'c' else None)
+    release.set()
+    drain_until(pool, lambda: len(order) == 2)
+    assert order == ['c', 'a']
+    assert pool.stats()['cancelled'] == 1
+
+
+def test_duplicate_key_is_ignored_and_errors_are_delivered(pool):
+    results = []
+
+    def fail():
+        raise ValueError("broken page")
+
+    pool.submit('page', lambda result, error: results.append(error), fail)
+    pool.submit('page', lambda result, error: results.append('duplicate'), fail)
+    drain_until(pool, lambda: results)
+    time.sleep(0.05)
+    pool.drain()
+    assert len(results) == 1 and isinstance(results[0], ValueError)
+
+
+def test_cancel_all_drops_running_results(pool):
+    release, done = occupy(pool)
+    pool.cancel_all()
+    release.set()
+    time.sleep(0.05)
+    pool.drain()
+    assert done == []
+    assert pool.pending == 0
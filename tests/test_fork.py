@@ -0,0 +1,32 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import archives
+import reader_engine
+import resources
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason="fork() is not available")
+
+
+def inherited_state():
+    return (len(getattr(archives._local, 'archives', None) or {}), len(reader_engine._disk_caches),
+            resources.snapshot())
+
+
+def test_forked_workers_do_not_inherit_handles(tmp_path):
+    import zipfile
+
+    archive_path = str(tmp_path / 'chapter.cbz')
+    with zipfile.ZipFile(archive_path, 'w') as archive:
+        archive.writestr('1.jpg', b'data')
+    archives.page_stat(archives.make_page_path(archive_path, '1.jpg'))
+    reader_engine.get_disk_cache(str(tmp_path / 'pages.sqlite3'))
+    assert inherited_state()[:2] != (0, 0)
+
+    context = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        assert executor.submit(inherited_state).result() == (0, 0, {})
+    archives.close_thread_archives()
@@ -0,0 +1,52 @@
+from reader_engine import WIDTH_BUCKETS, ChapterLayout, bucket_width, page_tiles
+
+
+def make_layout():
+    return ChapterLayout([('a.jpg', 'image', (100, 200)), ('b.webm', 'video', None),
+                          ('c.jpg', 'error', None), ('d.gif', 'animation', (50, 50))])
+
+
+def test_set_width_prefix_sums():
+    layout = make_layout()
+    total = layout.set_width(200)
+    assert layout.offsets == [0, 400, 460, 490, 690]
+    assert total == layout.total_height == 690
+    assert layout.height(0) == 400
+    assert layout.offset(3) == 490
+
+
+def test_page_at_and_visible_range():
+    layout = make_layout()
+    layout.set_width(200)
+    assert layout.page_at(-10) == 0
+    assert layout.page_at(399) == 0
+    assert layout.page_at(400) == 1
+    assert layout.page_at(10000) == 3
+    assert layout.visible_range(350, 480) == (0, 2)
+    assert ChapterLayout([]).page_at(0) == -1
+
+
+def test_scaled_height_and_edits():
+    layout = make_layout()
+    assert layout.scaled_height(0, 50) == 100
+    layout.drop_front(2)
+    layout.extend([('e.jpg', 'image', (10, 10))])
+    assert layout.set_width(10) == ChapterLayout.ERROR_HEIGHT + 10 + 10
+
+
+def test_bucket_width():
+    assert bucket_width(1) == WIDTH_BUCKETS[0]
+    assert bucket_width(880) == 960
+    assert bucket_width(960) == 960
+    assert bucket_width(961) == 1120
+    assert bucket_width(4000) == 4480
+    # Chaque tranche se rend à elle-même
+    assert all(bucket_width(width) == width for width in WIDTH_BUCKETS)
+
+
+def test_page_tiles_cover_tall_pages():
+    assert page_tiles(1000) == []
+    bands = page_tiles(20000)
+    assert bands[0][0] == 0
+    assert sum(height for _, height in bands) == 20000
+    assert all(top + height == next_top for (top, height), (next_top, _) in zip(bands, bands[1:]))
@@ -0,0 +1,77 @@
+import os
+
+from library import LibraryIndex, TitleIndex, natural_sort_key
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb'):
+        pass
+
+
+def make_library(tmp_path):
+    root = tmp_path / 'library'
+    for chapter in ('Chapter 1', 'Chapter 2', 'Chapter 10', 'Empty'):
+        os.makedirs(root / 'Series' / chapter)
+    for chapter in ('Chapter 1', 'Chapter 2', 'Chapter 10'):
+        for page in ('10.jpg', '2.jpg', '1.jpg', 'notes.txt'):
+            touch(str(root / 'Series' / chapter / page))
+    touch(str(tmp_path / 'outside' / '1.jpg'))
+    return LibraryIndex(str(root), ('.jpg',), index_path=str(tmp_path / 'index.json'))
+
+
+def test_natural_sort_key():
+    assert sorted(['10.jpg', '2.jpg', 'B.jpg', 'a.jpg'], key=natural_sort_key) == ['2.jpg', '10.jpg', 'a.jpg', 'B.jpg']
+
+
+def test_refresh_save_and_load(tmp_path):
+    library = make_library(tmp_path)
+    folders, rescanned = library.refresh()
+    assert rescanned == 6
+    library.folders = folders
+    chapter = os.path.join(library.root, 'Series', 'Chapter 2')
+    assert [os.path.basename(path) for path in library.media_paths(chapter)] == ['1.jpg', '2.jpg', '10.jpg']
+    library.save()
+
+    reloaded = LibraryIndex(library.root, ('.jpg',), index_path=library.index_path)
+    assert reloaded.load()
+    touch(os.path.join(chapter, '3.jpg'))
+    folders, rescanned = reloaded.refresh()
+    # Seul le dossier modifié est relu
+    assert rescanned == 1
+    assert folders[chapter].media == ['1.jpg', '2.jpg', '3.jpg', '10.jpg']
+
+
+def test_next_chapter(tmp_path):
+    library = make_library(tmp_path)
+    series = os.path.join(library.root, 'Series')
+    path, pages = library.next_chapter(os.path.join(series, 'Chapter 2'))
+    assert path == os.path.join(series, 'Chapter 10') and len(pages) == 3
+    # Le dossier sans page est sauté, et il n'y a rien après
+    assert library.next_chapter(os.path.join(series, 'Chapter 10')) == (None, [])
+
+
+def test_next_chapter_stays_in_library(tmp_path):
+    library = make_library(tmp_path)
+    assert library.next_chapter(library.root) == (None, [])
+    assert str(tmp_path) not in library.folders
+
+
+def test_title_index_search():
+    root = '/library'
+    entries = [(name, 'directory', f'{root}/{name}') for name in
+               ('Solo Leveling', 'Solo Leveling/Chapter 10', 'Solo Leveling/Chapter 2', 'Tower of God')]
+    index = TitleIndex(entries)
+    assert [path for path, _, _ in index.search('solo chapter')] == ['Solo Leveling/Chapter 2',
+                                                                      'Solo Leveling/Chapter 10']
+    assert [path for path, _, _ in index.search('OF')] == ['Tower of God']
+    assert index.search('missing') == []
+    assert index.search('  ') == []
+
+
+def test_title_index_from_folders(tmp_path):
+    library = make_library(tmp_path)
+    folders, _ = library.refresh()
+    index = TitleIndex.from_folders(library.root, folders)
+    assert len(index) == len(folders) - 1  # La racine n'est pas une entrée
+    assert index.search('chapter 1')[0][0] == os.path.join('Series', 'Chapter 1')
@@ -0,0 +1,84 @@
+import os
+
+import pytest
+from PIL import Image
+
+import reader_engine
+from reader_engine import load_chapter_layout, manifest_path, read_manifest
+
+
+@pytest.fixture
+def chapter(tmp_path):
+    directory = tmp_path / 'chapter'
+    directory.mkdir()
+    paths = []
+    for index in range(3):
+        path = str(directory / f'{index}.png')
+        Image.new('RGB', (10, 20 + index)).save(path)
+        paths.append(path)
+    reader_engine._layout_cache.clear()
+    yield str(directory), paths
+    reader_engine._layout_cache.clear()
+
+
+@pytest.fixture
+def header_reads(monkeypatch):
+    """Chemins dont l'en-tête est relue"""
+    reads = []
+    read_page_header = reader_engine.read_page_header
+
+    def counting(path):
+        reads.append(path)
+        return read_page_header(path)
+
+    monkeypatch.setattr(reader_engine, 'read_page_header', counting)
+    return reads
+
+
+def test_manifest_skips_header_reads(tmp_path, chapter, header_reads):
+    directory, paths = chapter
+    manifests = str(tmp_path / 'manifests')
+    layout = load_chapter_layout(paths, manifests)
+    assert len(header_reads) == 3
+    assert os.path.exists(manifest_path(manifests, directory))
+    assert read_manifest(manifests, directory)['pages'][1][:3] == [paths[1], 'image', [10, 21]]
+
+    reader_engine._layout_cache.clear()
+    again = load_chapter_layout(paths, manifests)
+    assert len(header_reads) == 3
+    assert again.pages == layout.pages
+
+
+def test_stale_manifest_rereads_new_pages_only(tmp_path, chapter, header_reads):
+    directory, paths = chapter
+    manifests = str(tmp_path / 'manifests')
+    load_chapter_layout(paths, manifests)
+    new_page = os.path.join(directory, '3.png')
+    Image.new('RGB', (10, 99)).save(new_page)
+    reader_engine._layout_cache.clear()
+    layout = load_chapter_layout(paths + [new_page], manifests)
+    assert header_reads[3:] == [new_page]
+    assert layout.pages[-1] == (new_page, 'image', (10, 99))
+
+
+def test_unreadable_manifest_is_rebuilt(tmp_path, chapter):
+    directory, paths = chapter
+    manifests = str(tmp_path / 'manifests')
+    os.makedirs(manifests)
+    with open(manifest_path(manifests, directory), 'w') as f:
+        f.write('{not json')
+    assert len(load_chapter_layout(paths, manifests)) == 3
+    assert read_manifest(manifests, directory) is not None
+
+
+def test_layout_cache_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(reader_engine, 'MAX_CACHED_LAYOUTS', 2)
+    reader_engine._layout_cache.clear()
+    for index in range(4):
+        directory = tmp_path / str(index)
+        directory.mkdir()
+        path = str(directory / '0.png')
+        Image.new('RGB', (4, 4)).save(path)
+        load_chapter_layout([path])
+    assert list(reader_engine._layout_cache) == [str(tmp_path / '2'), str(tmp_path / '3')]
+    reader_engine._layout_cache.clear()
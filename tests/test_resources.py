@@ -0,0 +1,32 @@
+import resources
+from resources import MemoryGovernor
+
+
+def test_counters_track_peak():
+    before = resources.snapshot().get('test', (0, 0))
+    resources.acquire('test')
+    resources.acquire('test')
+    resources.release('test')
+    count, peak = resources.snapshot()['test']
+    assert count == before[0] + 1
+    assert peak >= before[0] + 2
+    resources.release('test')
+
+
+def test_governor_steps_up_at_once_and_down_with_hysteresis():
+    governor = MemoryGovernor(100)
+    assert [governor.update(rss) for rss in (50, 80, 96, 90, 81, 79, 69, 65, 55)] == [0, 1, 3, 3, 3, 2, 1, 1, 0]
+    assert governor.name == 'normal'
+
+
+def test_governor_without_ceiling_or_measure():
+    governor = MemoryGovernor(0)
+    assert governor.update(10 ** 12) == 0
+    governor = MemoryGovernor(100)
+    governor.update(99)
+    assert governor.update(None) == 3
+
+
+def test_rss_bytes():
+    rss = resources.rss_bytes()
+    assert rss is None or rss > 0
@@ -0,0 +1,70 @@
+"""Lecture des vidéos WebM avec libvlc.
+
+python-vlc n'est importé qu'à la première vidéo ouverte : une bibliothèque
+sans vidéo ne paie jamais le chargement de libvlc, et l'absence de libvlc
+n'empêche pas le lecteur de démarrer. Une seule instance VLC et un seul
+lecteur sont créés pour toute la session et réutilisés d'une vidéo à l'autre.
+"""
+import os
+
+
+class VideoBackend:
+    """Instance VLC et lecteur partagés, créés à la première lecture"""
+    def __init__(self):
+        self.instance = None
+        self.player = None
+        self.error = None  # Raison de l'indisponibilité de la vidéo, une fois le chargement tenté
+
+    @property
+    def available(self):
+        """False si le chargement de libvlc a échoué ; True tant qu'il n'a pas été tenté"""
+        return self.error is None
+
+    def _load(self):
+        if self.player is not None:
+            return True
+        if self.error is not None:
+            return False
+        try:
+            import vlc
+            instance = vlc.Instance()
+            if instance is None:
+                raise RuntimeError("libvlc could not be initialized")
+            self.instance = instance
+            self.player = instance.media_player_new()
+        # python-vlc lève des erreurs variées quand la bibliothèque native est absente
+        except Exception as e:
+            self.error = f"Video playback unavailable: {e}"
+            self.instance = None
+            return False
+        return True
+
+    def play(self, path, window_id):
+        """Lit une vidéo dans la fenêtre native donnée ; retourne False si la vidéo est indisponible"""
+        if not self._load():
+            return False
+        self.player.stop()
+        media = self.instance.media_new(path)
+        self.player.set_media(media)
+        # Le lecteur garde sa propre référence sur le média
+        media.release()
+        if os.name == "nt":  # Windows
+            self.player.set_hwnd(window_id)
+        else:  # Linux, MacOS
+            self.player.set_xwindow(window_id)
+        self.player.play()
+        return True
+
+    def stop(self):
+        if self.player is not None:
+            self.player.stop()
+
+    def release(self):
+        """Libère le lecteur et l'instance VLC, à la fermeture de l'application"""
+        if self.player is not None:
+            self.player.stop()
+            self.player.release()
+            self.player = None
+        if self.instance is not None:
+            self.instance.release()
+            self.instance = None